@@ -0,0 +1,8 @@
+# PAW 的性能基准: 生成合成项目, 用 Pandoc 替身隔离出 PAW 自身的开销, 结果输出为 JSON。
+#
+# 用法 (在仓库根目录):
+#     python -m benchmarks --chapters 20 --words 2000 --bib-entries 5000 --figures 10
+#     python -m benchmarks --real-pandoc --output bench.json
+#
+# 启动开销的回归检查 (超出预算时以非零状态退出):
+#     python -m benchmarks.importtime --budget-ms 300
@@ -0,0 +1,91 @@
+# 启动开销的回归检查: 用 `python -X importtime` 运行简单命令, 统计导入耗时并与预算比较。
+#
+# 用法 (在仓库根目录):
+#     python -m benchmarks.importtime                  # 默认检查 `paw meow` 与 `paw --help`
+#     python -m benchmarks.importtime --budget-ms 150 --command woof
+#
+# 超出预算, 或者导入了不该在启动时加载的重型模块, 都会以非零状态退出, 可直接用于 CI。
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+# 简单命令在启动时不应导入的模块 (它们只属于 build / cite / zotero 等命令)
+HEAVY_MODULES = ("ruamel", "requests", "pyperclip", "paw.commands.build")
+DEFAULT_BUDGET_MS = 300
+DEFAULT_COMMANDS = [["meow"], ["--help"]]
+
+# 两种入口: pip 安装后的 `paw` 脚本 (paw.client:main), 以及 PyInstaller/Nuitka 打包使用的 run_paw.py
+ENTRY_POINTS = {
+    "pip": lambda args: ["-c", f"import sys; sys.argv = ['paw', *{args!r}]; from paw.client import main; main()"],
+    "run_paw": lambda args: [str(REPO_ROOT / "run_paw.py"), *args],
+}
+
+
+def parse_importtime(stderr: str) -> dict:
+    """解析 -X importtime 的输出, 返回 模块名 -> 累计耗时 (微秒) 以及顶层导入的总耗时"""
+    modules = {}
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # 表头
+        modules[name.strip()] = int(cumulative)
+        if len(name) - len(name.lstrip()) == 1:
+            total += int(cumulative)  # 更深的缩进表示嵌套导入, 只累加顶层
+    return {"modules": modules, "total_us": total}
+
+
+def measure(entry: str, args: list, repeat: int) -> dict:
+    env = dict(os.environ, PAW_NO_DAEMON="1", PYTHONPATH=os.pathsep.join(p for p in (str(REPO_ROOT / "src"), os.environ.get("PYTHONPATH", "")) if p))
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", *ENTRY_POINTS[entry](args)],
+            cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, encoding="utf-8", errors="replace",
+        )
+        # 命令本身失败 (例如不在项目中) 不影响导入耗时的统计
+        result = parse_importtime(proc.stderr)
+        result["returncode"] = proc.returncode
+        if best is None or result["total_us"] < best["total_us"]:
+            best = result
+    return best
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.importtime", description="Check PAW's cold-start import time against a budget.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help=f"import time budget per command (default: {DEFAULT_BUDGET_MS})")
+    parser.add_argument("--command", action="append", help="paw command line to check, e.g. 'woof' (repeatable, default: meow and --help)")
+    parser.add_argument("--entry", action="append", choices=sorted(ENTRY_POINTS), help="entry point to check (repeatable, default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per check; the fastest one counts")
+    args = parser.parse_args(argv)
+
+    commands = [c.split() for c in args.command] if args.command else DEFAULT_COMMANDS
+    # 重型模块检查只针对默认的简单命令; 自定义命令 (如 cite) 本来就需要它们
+    check_heavy = not args.command
+    failures = 0
+    for entry in args.entry or sorted(ENTRY_POINTS):
+        if entry == "run_paw" and hasattr(os, "geteuid") and os.geteuid() == 0:
+            print(f"SKIP  {entry}: run_paw.py refuses to run as root")
+            continue
+        for command in commands:
+            label = f"{entry} 'paw {' '.join(command)}'"
+            result = measure(entry, command, args.repeat)
+            total_ms = result["total_us"] / 1000
+            heavy = [name for name in HEAVY_MODULES if name in result["modules"]] if check_heavy else []
+            ok = total_ms <= args.budget_ms and not heavy
+            failures += not ok
+            note = f" (command exited with {result['returncode']})" if result["returncode"] else ""
+            print(f"{'OK  ' if ok else 'FAIL'}  {label}: {total_ms:.1f} ms of imports (budget {args.budget_ms:.0f} ms){note}")
+            if heavy:
+                print(f"      imported at startup: {', '.join(heavy)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
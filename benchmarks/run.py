@@ -0,0 +1,194 @@
+# 基准的运行器: 在合成项目中反复执行 paw 命令, 统计耗时并输出 JSON
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from . import synthetic
+
+STUB_PANDOC = Path(__file__).resolve().parent / "stub_pandoc.py"
+SCENARIOS = ["startup", "build-cold", "build-noop", "build-edit", "build-preview", "cite", "woof", "add-chapter", "metadata-yaml"]
+# metadata-yaml 场景中每次计时内解析 metadata.yaml 的次数
+YAML_LOADS = 100
+
+
+def install_stub(bin_dir: Path):
+    """把 Pandoc 替身放到一个单独的目录里, 之后把它放在 PATH 的最前面"""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    if os.name == "nt":
+        (bin_dir / "pandoc.cmd").write_text(f'@"{sys.executable}" "{STUB_PANDOC}" %*\r\n', encoding="utf-8")
+        return
+    script = bin_dir / "pandoc"
+    script.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{STUB_PANDOC}" "$@"\n', encoding="utf-8")
+    script.chmod(0o755)
+
+
+def paw(args: list, project: Path, env: dict, stdin: str | None = None):
+    """运行一次 paw 命令, 失败时带上输出抛出异常"""
+    proc = subprocess.run(
+        [sys.executable, "-m", "paw.main", *args], cwd=project, env=env, input=stdin,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace",
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"'paw {' '.join(args)}' failed with exit code {proc.returncode}:\n{proc.stdout[-2000:]}")
+
+
+def measure(repeat: int, action, prepare=None, cleanup=None) -> dict:
+    runs = []
+    for _ in range(repeat):
+        if prepare:
+            prepare()
+        started = time.perf_counter()
+        action()
+        runs.append(time.perf_counter() - started)
+        if cleanup:
+            cleanup()
+    return {
+        "runs": [round(r, 4) for r in runs],
+        "min": round(min(runs), 4),
+        "median": round(statistics.median(runs), 4),
+        "mean": round(statistics.fmean(runs), 4),
+        "max": round(max(runs), 4),
+    }
+
+
+def measure_yaml(project: Path, repeat: int) -> dict:
+    """在进程内比较 round-trip 与 safe 两种加载器解析 metadata.yaml 的耗时 (每次计时解析 YAML_LOADS 遍)"""
+    from paw import utils
+
+    text = (project / "manuscript" / "metadata.yaml").read_text(encoding="utf-8")
+    results = {}
+    for name, loader in (("round-trip", utils.round_trip_yaml()), ("safe", utils.safe_yaml())):
+        results[name] = measure(repeat, lambda loader=loader: [loader.load(text) for _ in range(YAML_LOADS)])
+    results["loads_per_run"] = YAML_LOADS
+    results["c_loader"] = "CParser" in type(utils.safe_yaml().parser).__name__
+    return results
+
+
+def run_scenarios(project: Path, env: dict, scenarios: list, repeat: int) -> dict:
+    output_dir = project / "output"
+    manuscript = project / "manuscript"
+    first_chapter = sorted(manuscript.glob("[0-9]*.md"))[0]
+    chapters_before = set(manuscript.glob("*.md"))
+
+    def clear_output():
+        shutil.rmtree(output_dir, ignore_errors=True)
+        output_dir.mkdir()
+
+    def edit_chapter():
+        with open(first_chapter, "a", encoding="utf-8") as f:
+            f.write("\nAn edited sentence.\n")
+
+    def remove_new_chapters():
+        for path in set(manuscript.glob("*.md")) - chapters_before:
+            path.unlink()
+
+    actions = {
+        # 最简单的命令: 测量解释器启动、导入与命令分派的开销
+        "startup": (lambda: paw(["meow"], project, env), None, None),
+        "build-cold": (lambda: paw(["build"], project, env), clear_output, None),
+        "build-noop": (lambda: paw(["build"], project, env), None, None),
+        "build-edit": (lambda: paw(["build"], project, env), edit_chapter, None),
+        "build-preview": (lambda: paw(["build", "--only", "1"], project, env), edit_chapter, None),
+        "cite": (lambda: paw(["cite", "analysis"], project, env, stdin="q\n"), None, None),
+        "woof": (lambda: paw(["woof"], project, env), None, None),
+        "add-chapter": (lambda: paw(["add", "chapter", "Benchmark"], project, env), None, remove_new_chapters),
+    }
+    results = {}
+    for name in scenarios:
+        if name == "metadata-yaml":
+            print(f"  {name}...", file=sys.stderr, flush=True)
+            results[name] = measure_yaml(project, repeat)
+            continue
+        action, prepare, cleanup = actions[name]
+        if name == "build-noop":
+            paw(["build"], project, env)  # 先确保缓存是热的
+        print(f"  {name}...", file=sys.stderr, flush=True)
+        results[name] = measure(repeat, action, prepare, cleanup)
+    return results
+
+
+def parse_args(argv: list | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark PAW on a synthetic project.")
+    parser.add_argument("--chapters", type=int, default=10)
+    parser.add_argument("--words", type=int, default=2000, help="words per chapter")
+    parser.add_argument("--bib-entries", type=int, default=1000, help="BibTeX entries (up to 50000)")
+    parser.add_argument("--figures", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per scenario")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="scenario to run (repeatable, default: all)")
+    parser.add_argument("--real-pandoc", action="store_true", help="use the Pandoc on PATH instead of the stub")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write the JSON report here instead of stdout")
+    parser.add_argument("--keep", action="store_true", help="keep the generated project")
+    args = parser.parse_args(argv)
+    if not 0 <= args.bib_entries <= 50000:
+        parser.error("--bib-entries must be between 0 and 50000")
+    if args.chapters < 1:
+        parser.error("--chapters must be at least 1")
+    return args
+
+
+def main(argv: list | None = None) -> int:
+    args = parse_args(argv)
+    workdir = Path(tempfile.mkdtemp(prefix="paw-bench-"))
+    # 隔离的 HOME: 不读写用户的 ~/.paw, 也不会连到正在运行的 paw daemon
+    home = workdir / "home"
+    home.mkdir()
+    os.environ["HOME"] = str(home)
+    os.environ["USERPROFILE"] = str(home)
+
+    env = dict(os.environ, PAW_NO_DAEMON="1", COLUMNS="120")
+    src_dir = Path(__file__).resolve().parent.parent / "src"
+    if src_dir.is_dir():
+        # 在仓库中直接运行时使用 src/ 下的代码
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (str(src_dir), env.get("PYTHONPATH", "")) if p)
+        sys.path.insert(0, str(src_dir))
+    if args.real_pandoc:
+        if not shutil.which("pandoc"):
+            print("error: --real-pandoc requires pandoc on PATH", file=sys.stderr)
+            return 1
+    else:
+        install_stub(workdir / "bin")
+        env["PATH"] = os.pathsep.join([str(workdir / "bin"), env.get("PATH", "")])
+
+    try:
+        print(f"Generating project in {workdir}...", file=sys.stderr, flush=True)
+        started = time.perf_counter()
+        project = synthetic.generate_project(workdir / "project", args.chapters, args.words, args.bib_entries, args.figures, args.seed)
+        generation = time.perf_counter() - started
+        results = run_scenarios(project, env, args.scenario or SCENARIOS, args.repeat)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandoc": "real" if args.real_pandoc else "stub",
+        "project": {
+            "chapters": args.chapters,
+            "words_per_chapter": args.words,
+            "bib_entries": args.bib_entries,
+            "figures": args.figures,
+            "seed": args.seed,
+            "generation_seconds": round(generation, 4),
+        },
+        "repeat": args.repeat,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return 0
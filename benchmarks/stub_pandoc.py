@@ -0,0 +1,85 @@
+# Pandoc 的替身: 只实现 PAW 会用到的那几种调用, 以接近零的成本产出结构正确的文件,
+# 让基准只测量 PAW 自身 (调度、缓存、解析) 的开销。不依赖 PAW, 只用标准库。
+
+import json
+import re
+import sys
+
+IMAGE = re.compile(r"!\[(.*?)\]\((.*?)\)")
+BIB_KEY = re.compile(r"@\w+\s*[{(]\s*([^,\s]+)\s*,")
+# 选项 -> 是否带参数
+OPTIONS_WITH_VALUE = {"-o", "-t", "--to", "-f", "--from", "-F", "--filter", "-L", "--lua-filter", "-M", "--metadata", "--metadata-file", "--bibliography", "--reference-doc", "--csl"}
+
+
+def parse_args(args: list) -> dict:
+    parsed = {"inputs": []}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in OPTIONS_WITH_VALUE and i + 1 < len(args):
+            parsed[arg.lstrip("-")] = args[i + 1]
+            i += 2
+            continue
+        if not arg.startswith("-"):
+            parsed["inputs"].append(arg)
+        i += 1
+    return parsed
+
+
+def markdown_to_ast(text: str) -> dict:
+    blocks = []
+    for chunk in text.split("\n\n"):
+        chunk = chunk.strip()
+        if not chunk:
+            continue
+        if chunk.startswith("#"):
+            level = len(chunk) - len(chunk.lstrip("#"))
+            blocks.append({"t": "Header", "c": [level, ["", [], []], [{"t": "Str", "c": chunk.lstrip("# ")}]]})
+            continue
+        image = IMAGE.match(chunk)
+        if image:
+            inline = {"t": "Image", "c": [["", [], []], [{"t": "Str", "c": image.group(1)}], [image.group(2), ""]]}
+            blocks.append({"t": "Para", "c": [inline]})
+            continue
+        blocks.append({"t": "Para", "c": [{"t": "Str", "c": chunk}]})
+    return {"pandoc-api-version": [1, 23, 1], "meta": {}, "blocks": blocks}
+
+
+def main(args: list) -> int:
+    if "--version" in args:
+        print("pandoc 3.1.11 (PAW benchmark stub)")
+        return 0
+    options = parse_args(args)
+    reader = options.get("f") or options.get("from") or "markdown"
+    writer = options.get("t") or options.get("to")
+    output = options.get("o")
+    if writer is None and output:
+        writer = output.rsplit(".", 1)[-1]
+
+    texts = [open(path, encoding="utf-8").read() for path in options["inputs"]] or [sys.stdin.read()]
+    if reader == "json":
+        document = {"pandoc-api-version": [1, 23, 1], "meta": {}, "blocks": []}
+        for text in texts:
+            ast = json.loads(text)
+            document["meta"].update(ast.get("meta", {}))
+            document["blocks"].extend(ast.get("blocks", []))
+    elif reader in ("bibtex", "biblatex"):
+        document = [{"id": key, "type": "article-journal"} for text in texts for key in BIB_KEY.findall(text)]
+    else:
+        document = markdown_to_ast("\n\n".join(texts))
+
+    if writer in ("json", "csljson"):
+        result = json.dumps(document)
+    else:
+        blocks = document["blocks"] if isinstance(document, dict) else []
+        result = f"stub {writer} document with {len(blocks)} blocks\n"
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(result)
+    else:
+        sys.stdout.write(result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
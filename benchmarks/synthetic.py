@@ -0,0 +1,97 @@
+# 生成合成的 PAW 项目: 章节数、每章字数、参考文献条目数与图片数都可以配置
+
+import contextlib
+import io
+import random
+import struct
+import zlib
+from pathlib import Path
+
+WORDS = (
+    "analysis method result model data theory evidence approach framework study "
+    "structure process effect system value policy market court law judgment "
+    "argument section figure table sample variance estimate regression network "
+    "language history context principle interpretation standard review"
+).split()
+SURNAMES = ["Smith", "Zhang", "Müller", "García", "Wang", "Tanaka", "Okafor", "Novak", "Rossi", "Kim"]
+JOURNALS = ["Journal of Synthetic Studies", "Law Review", "Annals of Benchmarks", "Quarterly Methods"]
+
+
+def _tiny_png(size: int = 32) -> bytes:
+    """只用标准库生成一张纯色 PNG"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+    raw = b"".join(b"\x00" + b"\x80\x40\x20" * size for _ in range(size))
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(8, 20))
+    return " ".join(words).capitalize() + "."
+
+
+def bib_entry(index: int, rng: random.Random) -> str:
+    authors = " and ".join(f"{rng.choice(SURNAMES)}, {chr(65 + rng.randrange(26))}." for _ in range(rng.randint(1, 3)))
+    title = " ".join(rng.choices(WORDS, k=rng.randint(4, 10))).title()
+    return (
+        f"@article{{ref{index},\n"
+        f"  author = {{{authors}}},\n"
+        f"  title = {{{title}}},\n"
+        f"  journal = {{{rng.choice(JOURNALS)}}},\n"
+        f"  year = {{{rng.randint(1950, 2025)}}},\n"
+        f"  volume = {{{rng.randint(1, 80)}}},\n"
+        f"  pages = {{{rng.randint(1, 400)}--{rng.randint(401, 800)}}}\n"
+        f"}}\n"
+    )
+
+
+def chapter_text(number: int, words: int, bib_entries: int, figures: int, rng: random.Random) -> str:
+    """一章正文: 标题、若干段落, 穿插引用、图片与交叉引用"""
+    lines = [f"# Chapter {number} {{#sec:chapter-{number}}}", ""]
+    written = 0
+    paragraph = 0
+    while written < words:
+        sentences = [_sentence(rng) for _ in range(rng.randint(3, 6))]
+        if bib_entries:
+            sentences.append(f"See [@ref{rng.randrange(bib_entries)}; @ref{rng.randrange(bib_entries)}].")
+        if number > 1 and paragraph % 5 == 0:
+            sentences.append(f"As discussed in @sec:chapter-{number - 1}.")
+        text = " ".join(sentences)
+        lines.extend([text, ""])
+        written += len(text.split())
+        paragraph += 1
+        if figures and paragraph % 7 == 0:
+            figure = rng.randrange(figures)
+            lines.extend([f"![Figure {figure}](figures/figure-{figure}.png){{#fig:c{number}p{paragraph}}}", ""])
+    return "\n".join(lines)
+
+
+def generate_project(path: Path, chapters: int = 10, words: int = 2000, bib_entries: int = 1000, figures: int = 5, seed: int = 0) -> Path:
+    """通过 create_project 创建项目骨架, 再填充合成的章节、文献与图片"""
+    from paw.commands.new import create_project
+
+    rng = random.Random(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_project(path, "PAW Benchmark")
+
+    manuscript = path / "manuscript"
+    (manuscript / "01-introduction.md").unlink()
+    for number in range(1, chapters + 1):
+        text = chapter_text(number, words, bib_entries, figures, rng)
+        (manuscript / f"{number:02d}-chapter-{number}.md").write_text(text, encoding="utf-8")
+
+    with open(path / "resources" / "bibliography.bib", "w", encoding="utf-8") as f:
+        for index in range(bib_entries):
+            f.write(bib_entry(index, rng))
+            f.write("\n")
+
+    png = _tiny_png()
+    for index in range(figures):
+        (path / "figures" / f"figure-{index}.png").write_bytes(png)
+
+    # 合成项目不需要全局 CSL 样式
+    metadata = manuscript / "metadata.yaml"
+    text = metadata.read_text(encoding="utf-8").replace('csl: "law-citation-manual.csl"', "# csl: none")
+    metadata.write_text(text, encoding="utf-8")
+    return path
@@ -119,10 +119,11 @@ def run_final_build():
         # 添加一些常见的、PyInstaller 容易遗漏的隐藏依赖
         "--hidden-import", "pkg_resources.py2_warn",
         "--hidden-import", "requests",
-        "--hidden-import", "pybtex",
         "--hidden-import", "pyperclip",
         "--hidden-import", "rich",
         "--hidden-import", "ruamel.yaml",
+        # 命令模块由 paw.registry 按名称动态导入, PyInstaller 分析不到, 需要显式收集
+        "--collect-submodules", "paw.commands",
         "run_paw.py",
     ]
     
@@ -91,6 +91,7 @@ def run_nuitka():
         "nuitka",
         "--standalone",
         "--static-libpython=no",
+        # 命令模块由 paw.registry 按名称动态导入, 必须整包包含
         "--include-package=paw",
         "--include-package-data=certifi",
         "run_paw.py",
@@ -28,9 +28,14 @@ def main():
         # 我们可以安全地忽略这个检查。
         pass
 
+    # 打包后的可执行文件中, 图片转换等工作进程需要由 freeze_support 接管
+    import multiprocessing
+    multiprocessing.freeze_support()
+
     # 只有在权限检查通过后，才导入并运行我们的主应用
-    from paw.main import app
-    sys.exit(app())
+    # paw daemon 运行时, 常用命令会直接转交给它执行
+    from paw.client import main as client_main
+    client_main()
 
 
 if __name__ == "__main__":
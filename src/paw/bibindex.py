@@ -0,0 +1,382 @@
+# 参考文献索引: 把 .bib 条目的摘要 (key、作者、年份、标题) 与倒排表持久化到 SQLite,
+# cite / woof 等命令直接查询索引, 只有指纹 (mtime + size) 变化的 .bib 文件才会重新解析。
+
+import os
+import sqlite3
+import time
+from collections import Counter, OrderedDict
+from contextlib import closing
+from pathlib import Path
+from typing import NamedTuple
+from . import bibtex, search
+from .cache import stat_key
+
+INDEX_NAME = "bibliography.sqlite"
+# 表结构或分词方式改变时递增, 旧索引会被整体重建
+SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    authors TEXT NOT NULL,
+    year TEXT NOT NULL,
+    title TEXT NOT NULL,
+    length REAL NOT NULL,
+    UNIQUE (path, position)
+);
+CREATE INDEX IF NOT EXISTS entries_key ON entries (key);
+CREATE TABLE IF NOT EXISTS postings (
+    token TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    tf REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS postings_token ON postings (token);
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc);
+CREATE TABLE IF NOT EXISTS vocab (
+    token TEXT PRIMARY KEY
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS usage (
+    key TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+"""
+
+
+class BibRecord(NamedTuple):
+    """索引中的一条文献; authors 为显示用的作者列表"""
+    key: str
+    authors: str
+    year: str
+    title: str
+
+
+def format_authors(names: list) -> str:
+    if not names:
+        return "Unknown Author"
+    if len(names) > 2:
+        return f"{', '.join(names[:-1])}, and {names[-1]}"
+    return " and ".join(names)
+
+
+# 建索引时需要读取的字段
+_INDEXED_FIELDS = ("author", "editor", "title", "year", "journal", "journaltitle", "booktitle",
+                   "publisher", "keywords", "abstract", "doi")
+
+
+def _document(key: str, fields: dict) -> dict:
+    """一条文献中参与检索的字段文本, 字段名见 search.FIELDS"""
+    persons = bibtex.split_names(fields.get("author", "")) + bibtex.split_names(fields.get("editor", ""))
+    return {
+        "key": key,
+        "author": " ".join(persons),
+        "title": fields.get("title", ""),
+        "year": fields.get("year", ""),
+        "journal": " ".join(fields.get(name, "") for name in ("journal", "journaltitle", "booktitle", "publisher")),
+        "keywords": fields.get("keywords", ""),
+        "abstract": fields.get("abstract", ""),
+        "doi": fields.get("doi", ""),
+    }
+
+
+def parse_bib_records(bib_path: Path):
+    """
+    逐条产出一个 .bib 文件中的 (BibRecord, 检索字段)。文件以内存映射的方式扫描,
+    每个条目只解析建索引需要的字段, 内存占用与文件大小无关。
+    """
+    with bibtex.BibFile(bib_path) as bib:
+        for key in bib.keys():
+            fields = bib.fields(key, _INDEXED_FIELDS)
+            names = [bibtex.format_name(name) for name in bibtex.split_names(fields.get("author", ""))]
+            record = BibRecord(
+                key=key,
+                authors=format_authors(names),
+                year=fields.get("year") or "N/A",
+                title=fields.get("title") or "No Title",
+            )
+            yield record, _document(key, fields)
+
+
+def _postings(document: dict) -> tuple:
+    """把检索字段归约为 token -> 加权词频, 以及加权后的文档长度"""
+    weights = Counter()
+    length = 0.0
+    for field, weight in zip(search.FIELDS, search.FIELD_WEIGHTS):
+        terms = search.index_terms(str(document.get(field, "")))
+        length += weight * len(terms)
+        for token in terms:
+            weights[token] += weight
+    return weights, length
+
+
+def _scope(conn: sqlite3.Connection, bib_paths: list) -> dict:
+    """这些 .bib 文件中的有效条目: 文档 id -> (key, 长度); 不同文件中的重复 key 以后面的文件为准"""
+    winners = {}
+    for bib_path in bib_paths:
+        rows = conn.execute("SELECT id, key, length FROM entries WHERE path = ? ORDER BY position",
+                            (os.path.abspath(bib_path),))
+        for doc, key, length in rows:
+            winners[key] = (doc, length)
+    return {doc: (key, length) for key, (doc, length) in winners.items()}
+
+
+def _fetch(conn: sqlite3.Connection, docs: list) -> dict:
+    found = {}
+    for start in range(0, len(docs), 500):
+        chunk = docs[start:start + 500]
+        rows = conn.execute(
+            f"SELECT id, key, authors, year, title FROM entries WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        for row in rows:
+            found[row[0]] = BibRecord(*row[1:])
+    return found
+
+
+class BibIndex:
+    """
+    一个项目的参考文献索引, 保存在 output/.cache/bibliography.sqlite。
+
+    refresh() 比较每个 .bib 文件的指纹, 只重新解析变化过的文件;
+    之后的查询只读 SQLite。检索使用倒排表与 BM25 打分,
+    见 search()。
+    """
+    def __init__(self, output_dir: Path):
+        self.path = output_dir / ".cache" / INDEX_NAME
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            conn.executescript(
+                "DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS entries; "
+                "DROP TABLE IF EXISTS postings; DROP TABLE IF EXISTS vocab;"
+            )
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def refresh(self, bib_paths: list) -> list:
+        """
+        更新索引中这些 .bib 文件的条目。返回 (路径, 错误) 列表; 解析失败的文件保留旧条目
+        (若有), 不影响其他文件。
+        """
+        errors = []
+        with closing(self._connect()) as conn:
+            known = {row[0]: (row[1], row[2]) for row in conn.execute("SELECT path, mtime_ns, size FROM files")}
+            for bib_path in bib_paths:
+                path = os.path.abspath(bib_path)
+                stamp = stat_key(bib_path)
+                if stamp is None or known.get(path) == stamp:
+                    continue
+                try:
+                    with conn:
+                        self._replace_file(conn, path, parse_bib_records(bib_path))
+                        conn.execute("INSERT OR REPLACE INTO files (path, mtime_ns, size) VALUES (?, ?, ?)", (path,) + stamp)
+                except (OSError, ValueError) as e:
+                    # 事务回滚, 保留这个文件原有的条目
+                    errors.append((bib_path, e))
+        return errors
+
+    @staticmethod
+    def _replace_file(conn: sqlite3.Connection, path: str, records):
+        conn.execute("DELETE FROM postings WHERE doc IN (SELECT id FROM entries WHERE path = ?)", (path,))
+        conn.execute("DELETE FROM entries WHERE path = ?", (path,))
+        postings, tokens = [], set()
+        for position, (record, document) in enumerate(records):
+            weights, length = _postings(document)
+            doc = conn.execute(
+                "INSERT INTO entries (path, position, key, authors, year, title, length) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, position) + tuple(record) + (length,),
+            ).lastrowid
+            postings.extend((token, doc, tf) for token, tf in weights.items())
+            tokens.update(weights)
+            if len(postings) > 100000:
+                # 分批写入, 大文件也不必把整个倒排表留在内存中
+                conn.executemany("INSERT INTO postings (token, doc, tf) VALUES (?, ?, ?)", postings)
+                postings.clear()
+        conn.executemany("INSERT INTO postings (token, doc, tf) VALUES (?, ?, ?)", postings)
+        conn.executemany("INSERT OR IGNORE INTO vocab (token) VALUES (?)", [(token,) for token in tokens])
+
+    def records(self, bib_paths: list) -> list:
+        """这些 .bib 文件中的全部条目, 按文件中的顺序"""
+        with closing(self._connect()) as conn:
+            docs = list(_scope(conn, bib_paths))
+            found = _fetch(conn, docs)
+        return [found[doc] for doc in docs]
+
+    def count(self, bib_paths: list) -> int:
+        with closing(self._connect()) as conn:
+            return len(_scope(conn, bib_paths))
+
+    def search(self, bib_paths: list, terms: list) -> list:
+        """
+        检索同时匹配全部查询词的条目, 按 BM25 得分 (乘以最近使用的加权) 从高到低返回 (BibRecord, 得分)。
+        查询词支持前缀与拼写容错; 没有查询词时返回全部条目, 最近使用过的排在前面。
+        """
+        with closing(self.session(bib_paths)) as session:
+            return session.page(terms)[1]
+
+    def session(self, bib_paths: list, cache_size: int = 32) -> "SearchSession":
+        """
+        打开一个检索会话, 供交互式选择器等需要连续检索的场合使用 (用完需 close)。
+        cache_size 为缓存的最近查询数; 各次查询互不相关时 (例如批量解析) 传 0 关闭缓存。
+        """
+        return SearchSession(self, bib_paths, cache_size)
+
+    def record_use(self, keys: list):
+        """记录被复制的引用键, 之后的检索中它们会排得更靠前"""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT INTO usage (key, count, last_used) VALUES (?, 1, ?) "
+                "ON CONFLICT (key) DO UPDATE SET count = count + 1, last_used = excluded.last_used",
+                [(key, now) for key in keys],
+            )
+
+
+def _is_prefix_term(term: str) -> bool:
+    """查询词是否按前缀匹配全部词项; 过短的词会展开出大半个词表, 只按完整词匹配"""
+    return len(term) >= search.MIN_PREFIX and not search.is_cjk(term)
+
+
+class SearchSession:
+    """
+    在一个打开的索引连接上连续检索。检索范围、平均文档长度与使用记录只读取一次;
+    最近若干次检索的排序结果按查询缓存, 查询在上一次的基础上继续输入 (词变长或增加新词) 时,
+    只在上一次的结果中重新打分, 交互式选择器每次按键的开销随结果变少而下降。
+    """
+    def __init__(self, index: BibIndex, bib_paths: list, cache_size: int = 32):
+        self._conn = index._connect()
+        self.scope = _scope(self._conn, bib_paths)
+        self._order = {doc: i for i, doc in enumerate(self.scope)}
+        self._avg_length = sum(length for _, length in self.scope.values()) / len(self.scope) if self.scope else 0.0
+        self._usage = {key: (count, last_used) for key, count, last_used
+                       in self._conn.execute("SELECT key, count, last_used FROM usage")}
+        # 最近的查询 (词项元组) -> (排序后的 [(文档 id, 得分)], 是否用到了拼写容错), 最久未用的在前
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return len(self.scope)
+
+    def rank(self, terms: list) -> list:
+        """检索并排序, 返回 [(文档 id, 得分)]"""
+        query = tuple(dict.fromkeys(token for term in terms for token in search.tokenize(term)))
+        cached = self._cache.get(query)
+        if cached is not None:
+            self._cache.move_to_end(query)
+            return cached[0]
+        if not query:
+            scores, fuzzy = {doc: 0.0 for doc in self.scope}, False
+        else:
+            scores, fuzzy = self._score(query, self._candidates(query))
+        now = time.time()
+        ranked = []
+        for doc, score in scores.items():
+            count, last_used = self._usage.get(self.scope[doc][0], (0, now))
+            boost = search.usage_boost(count, (now - last_used) / 86400)
+            ranked.append((doc, score * boost if query else boost - 1))
+        # 得分相同时保持文件中的顺序
+        ranked.sort(key=lambda item: (-item[1], self._order[item[0]]))
+        if self._cache_size:
+            self._cache[query] = (ranked, fuzzy)
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return ranked
+
+    def page(self, terms: list, offset: int = 0, limit: int | None = None) -> tuple:
+        """检索并只读取一页结果的详细信息, 返回 (匹配总数, [(BibRecord, 得分)])"""
+        ranked = self.rank(terms)
+        window = ranked[offset:None if limit is None else offset + limit]
+        found = _fetch(self._conn, [doc for doc, _ in window])
+        return len(ranked), [(found[doc], score) for doc, score in window]
+
+    def _candidates(self, query: tuple) -> set | None:
+        """
+        找一个已缓存的、被当前查询 "延长" 的查询: 词数不多于当前查询, 且每个词都是对应位置新词的前缀
+        (并且在那次检索中按前缀匹配了全部词项)。它的结果一定包含当前查询的全部结果 (用到拼写容错的结果除外)。
+        """
+        best = None
+        for previous, (ranked, fuzzy) in self._cache.items():
+            if fuzzy or not previous or len(previous) > len(query):
+                continue
+            if all(new == old or (new.startswith(old) and _is_prefix_term(old))
+                   for old, new in zip(previous, query)):
+                if best is None or len(ranked) < len(best):
+                    best = ranked
+        return None if best is None else {doc for doc, _ in best}
+
+    def _matches(self, term: str, last: bool = False) -> dict:
+        """
+        查询词匹配到的倒排表: 词项 -> (匹配折扣, [(文档 id, 加权词频)])。
+        完整词与前缀在一次范围查询中取出; 都没有时再按拼写容错查找相近的词项。
+        last 表示这是查询的最后一个词 (可能还在输入): 过短时除完整词外再取少量以它开头的词项,
+        开销与文献库的大小无关。
+        """
+        if _is_prefix_term(term):
+            rows = self._conn.execute("SELECT token, doc, tf FROM postings WHERE token >= ? AND token < ?",
+                                (term, term + "\uffff"))
+        elif last and not search.is_cjk(term):
+            tokens = [term] + [token for (token,) in self._conn.execute(
+                "SELECT token FROM vocab WHERE token > ? AND token < ? LIMIT ?",
+                (term, term + "\uffff", search.SHORT_PREFIX_TOKENS))]
+            rows = self._conn.execute(
+                f"SELECT token, doc, tf FROM postings WHERE token IN ({', '.join('?' * len(tokens))})", tokens)
+        else:
+            rows = self._conn.execute("SELECT token, doc, tf FROM postings WHERE token = ?", (term,))
+        matches = {}
+        for token, doc, tf in rows:
+            quality = search.EXACT if token == term else search.PREFIX
+            matches.setdefault(token, (quality, []))[1].append((doc, tf))
+        if matches:
+            return matches
+
+        limit = search.max_typos(term)
+        if not limit:
+            return matches
+        # 假定首字母没有写错, 只比较同一首字母下的词项
+        rows = self._conn.execute("SELECT token FROM vocab WHERE token >= ? AND token < ?", (term[0], term[0] + "\uffff"))
+        for (token,) in rows:
+            if search.within_distance(term, token, limit):
+                postings = self._conn.execute("SELECT doc, tf FROM postings WHERE token = ?", (token,)).fetchall()
+                if postings:
+                    matches[token] = (search.FUZZY, postings)
+        return matches
+
+    def _score(self, query: tuple, candidates: set | None) -> tuple:
+        """BM25 打分; 文档频率按整个检索范围计算, 只为 candidates 中的文档打分。返回 (得分, 是否用到拼写容错)"""
+        scope = self.scope
+        n_docs = len(scope)
+        scores = None
+        fuzzy = False
+        for i, term in enumerate(query):
+            term_scores = {}
+            for quality, postings in self._matches(term, i == len(query) - 1).values():
+                fuzzy = fuzzy or quality == search.FUZZY
+                postings = [(doc, tf) for doc, tf in postings if doc in scope]
+                if not postings:
+                    continue
+                token_idf = search.idf(n_docs, len(postings))
+                for doc, tf in postings:
+                    if candidates is not None and doc not in candidates:
+                        continue
+                    value = quality * search.bm25(tf, scope[doc][1], self._avg_length, token_idf)
+                    if value > term_scores.get(doc, 0.0):
+                        term_scores[doc] = value
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc: scores[doc] + value for doc, value in term_scores.items() if doc in scores}
+            if not scores:
+                return {}, fuzzy
+        return scores, fuzzy
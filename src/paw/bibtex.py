@@ -0,0 +1,315 @@
+# 轻量级 BibTeX 扫描器: 条目切分与按需读取字段, 不构建 pybtex 的完整对象图
+
+import re
+
+_ENTRY_START = re.compile(r"@\s*([A-Za-z]+)\s*([{(])")
+_ENTRY_START_B = re.compile(rb"@\s*([A-Za-z]+)\s*([{(])")
+_DELIMITERS = re.compile(r"[{})]")
+_DELIMITERS_B = re.compile(rb"[{})]")
+_CROSSREF_FIELD = re.compile(r"\bcrossref\s*=\s*[{\"]\s*([^}\"\s]+)\s*[}\"]", re.IGNORECASE)
+
+# Pandoc 的引用语法: @key 或 @{key}; key 内部允许的标点见 Pandoc 手册 "Citation syntax"
+_CITATION = re.compile(r"(?<![\w@.])-?@(?:\{([^}]+)\}|([\w][\w:.#$%&+?<>~/-]*))")
+
+# 总是需要保留的特殊条目
+_SPECIAL_TYPES = {"string", "preamble"}
+
+
+def iter_entries(text):
+    """
+    依次产出 (entry_type, key, start, end), start/end 为条目在 text 中的切片位置。
+    @string 与 @preamble 条目的 key 为 None, @comment 被跳过。
+    text 可以是 str, 也可以是 bytes / mmap (此时 entry_type 与 key 仍解码为 str)。
+    """
+    binary = not isinstance(text, str)
+    entry_start, delimiters = (_ENTRY_START_B, _DELIMITERS_B) if binary else (_ENTRY_START, _DELIMITERS)
+    pos = 0
+    length = len(text)
+    while True:
+        match = entry_start.search(text, pos)
+        if not match:
+            return
+        entry_type = match.group(1).lower()
+        if binary:
+            entry_type = entry_type.decode("ascii")
+        closer = "}" if match.group(2) in ("{", b"{") else ")"
+        body_start = match.end()
+
+        # 按括号深度找到条目结尾; 只在括号处停下, 不逐字符扫描
+        depth = 0
+        end = length
+        for delimiter in delimiters.finditer(text, body_start):
+            char = delimiter.group()
+            if binary:
+                char = char.decode("ascii")
+            if char == "{":
+                depth += 1
+            elif char == "}":
+                if depth == 0 and closer == "}":
+                    end = delimiter.end()
+                    break
+                depth -= 1
+            elif char == ")" and depth == 0 and closer == ")":
+                end = delimiter.end()
+                break
+        pos = end
+
+        if entry_type == "comment":
+            continue
+        if entry_type in _SPECIAL_TYPES:
+            yield entry_type, None, match.start(), end
+            continue
+        comma = text.find(b"," if binary else ",", body_start, end)
+        key = text[body_start:comma if comma != -1 else end - 1]
+        if binary:
+            key = key.decode("utf-8", errors="replace")
+        yield entry_type, key.strip(), match.start(), end
+
+
+def find_citation_keys(text: str) -> set:
+    """找出 Markdown 中的全部引用键 (包括 @fig:x 这类交叉引用, 由调用方自行过滤)"""
+    keys = set()
+    for braced, bare in _CITATION.findall(text):
+        key = braced or bare
+        # 结尾的标点属于正文而不是 key
+        keys.add(key if braced else key.rstrip(":.#$%&+?<>~/-"))
+    return keys
+
+
+def extract_entries(text: str, keys: set) -> tuple:
+    """
+    从 BibTeX 文本中抽取指定 key 的条目原文, 连同全部 @string/@preamble,
+    并沿 crossref 字段补齐被引用的父条目。
+    返回 (抽取出的 BibTeX 文本, 找到的 key 集合)。
+    """
+    specials, spans = [], {}
+    for entry_type, key, start, end in iter_entries(text):
+        if key is None:
+            specials.append(text[start:end])
+        elif key not in spans:
+            spans[key] = (start, end)
+
+    wanted = [key for key in keys if key in spans]
+    selected = set()
+    while wanted:
+        key = wanted.pop()
+        if key in selected:
+            continue
+        selected.add(key)
+        start, end = spans[key]
+        for parent in _CROSSREF_FIELD.findall(text, start, end):
+            if parent in spans and parent not in selected:
+                wanted.append(parent)
+
+    # 保持条目在原文件中的顺序
+    ordered = sorted(selected, key=lambda k: spans[k][0])
+    chunks = specials + [text[spans[k][0]:spans[k][1]] for k in ordered]
+    return "\n\n".join(chunks) + "\n", selected
+
+
+# ---- 按需读取字段 ----
+
+_FIELD_NAME = re.compile(r"\s*,?\s*([A-Za-z][\w:.+-]*)\s*=\s*")
+_BARE_VALUE = re.compile(r"[\w:.+-]+")
+_AND = re.compile(r"\s+and\s+", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+# BibTeX 预定义的月份宏
+_DEFAULT_MACROS = {
+    month: str(number) for number, month in enumerate(
+        ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)
+}
+
+
+def _matching_brace(text: str, start: int) -> int:
+    """text[start] 为 "{", 返回与之配对的 "}" 的下标 (找不到时为 len(text))"""
+    depth = 0
+    for match in _DELIMITERS.finditer(text, start):
+        char = match.group()
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return match.start()
+    return len(text)
+
+
+def _parse_value(text: str, pos: int, macros: dict) -> tuple:
+    """解析一个字段值 ({...}、"..."、数字或 @string 宏, 可用 # 连接), 返回 (值, 结束位置)"""
+    parts = []
+    length = len(text)
+    while pos < length:
+        while pos < length and text[pos].isspace():
+            pos += 1
+        if pos >= length:
+            break
+        char = text[pos]
+        if char == "{":
+            end = _matching_brace(text, pos)
+            parts.append(text[pos + 1:end])
+            pos = end + 1
+        elif char == '"':
+            end = pos + 1
+            depth = 0
+            while end < length and not (text[end] == '"' and depth == 0):
+                if text[end] == "{":
+                    depth += 1
+                elif text[end] == "}":
+                    depth -= 1
+                end += 1
+            parts.append(text[pos + 1:end])
+            pos = end + 1
+        else:
+            match = _BARE_VALUE.match(text, pos)
+            if not match:
+                break
+            word = match.group()
+            parts.append(word if word.isdigit() else macros.get(word.lower(), word))
+            pos = match.end()
+        while pos < length and text[pos].isspace():
+            pos += 1
+        if pos < length and text[pos] == "#":
+            pos += 1
+            continue
+        break
+    return _SPACE.sub(" ", "".join(parts)).strip(), pos
+
+
+def parse_fields(entry_text: str, names=None, macros: dict | None = None) -> dict:
+    """
+    从一条条目的原文中读取字段, 返回 小写字段名 -> 值。
+    names 不为空时只保留这些字段; 值中的花括号与 LaTeX 命令原样保留 (与 pybtex 一致)。
+    """
+    macros = _DEFAULT_MACROS if macros is None else macros
+    wanted = {name.lower() for name in names} if names else None
+    brace = entry_text.find("{")
+    paren = entry_text.find("(")
+    body_start = min(i for i in (brace, paren, len(entry_text)) if i != -1) + 1
+    comma = entry_text.find(",", body_start)
+    if comma == -1:
+        return {}
+    fields = {}
+    pos = comma
+    while True:
+        match = _FIELD_NAME.match(entry_text, pos)
+        if not match:
+            return fields
+        name = match.group(1).lower()
+        value, pos = _parse_value(entry_text, match.end(), macros)
+        if (wanted is None or name in wanted) and name not in fields:
+            fields[name] = value
+
+
+def split_names(value: str) -> list:
+    """按花括号外的 and 拆分作者列表"""
+    names, depth, start = [], 0, 0
+    protected = []
+    for i, char in enumerate(value):
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+        protected.append(depth > 0)
+    for match in _AND.finditer(value):
+        if not protected[match.start()]:
+            names.append(value[start:match.start()])
+            start = match.end()
+    names.append(value[start:])
+    return [name.strip() for name in names if name.strip()]
+
+
+def format_name(name: str) -> str:
+    """把一个作者名整理为 "von Last, First" 的形式 (与 str(pybtex.Person) 大致相同)"""
+    if "," in name:
+        return ", ".join(part.strip() for part in name.split(",") if part.strip())
+    words = []
+    depth = 0
+    current = ""
+    for char in name:
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+        if char.isspace() and depth == 0:
+            if current:
+                words.append(current)
+            current = ""
+        else:
+            current += char
+    if current:
+        words.append(current)
+    if len(words) < 2:
+        return name
+    # 名字之后第一个小写开头的词起为 von 部分 (如 Ludwig van Beethoven)
+    last_start = len(words) - 1
+    for i, word in enumerate(words[:-1]):
+        if word[:1].islower():
+            last_start = i
+            break
+    if last_start == 0:
+        return " ".join(words)
+    return f"{' '.join(words[last_start:])}, {' '.join(words[:last_start])}"
+
+
+class BibFile:
+    """
+    内存映射的 .bib 文件。打开时只扫描一遍, 记录每个条目 key 的字节偏移;
+    字段在需要时才从对应的字节区间中解码、解析, 不构建整个文献库的对象图。
+    """
+    def __init__(self, path):
+        import mmap
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # 空文件无法映射
+            self._data = b""
+        self.spans = {}
+        self._string_spans = []
+        self._macros = None
+        for entry_type, key, start, end in iter_entries(self._data):
+            if key is None:
+                if entry_type == "string":
+                    self._string_spans.append((start, end))
+            elif key not in self.spans:
+                self.spans[key] = (start, end)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if not isinstance(self._data, bytes):
+            self._data.close()
+        self._file.close()
+
+    def keys(self) -> list:
+        """全部条目 key, 按文件中的顺序"""
+        return list(self.spans)
+
+    def text(self, key: str) -> str:
+        start, end = self.spans[key]
+        return self._data[start:end].decode("utf-8", errors="replace")
+
+    @property
+    def macros(self) -> dict:
+        """@string 定义的宏 (第一次用到时才解析)"""
+        if self._macros is None:
+            macros = dict(_DEFAULT_MACROS)
+            for start, end in self._string_spans:
+                text = self._data[start:end].decode("utf-8", errors="replace")
+                body = text[min(i for i in (text.find("{"), text.find("("), len(text)) if i != -1) + 1:]
+                match = _FIELD_NAME.match(body)
+                if match:
+                    macros[match.group(1).lower()] = _parse_value(body, match.end(), macros)[0]
+            self._macros = macros
+        return self._macros
+
+    def fields(self, key: str, names=None) -> dict:
+        """读取一个条目的字段; names 不为空时只返回这些字段"""
+        return parse_fields(self.text(key), names, self.macros)
+
@@ -0,0 +1,149 @@
+# 构建缓存: 对编译输入做内容指纹, 跳过未发生变化的编译目标
+
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+MANIFEST_NAME = ".paw-build.json"
+MANIFEST_VERSION = 1
+
+
+def sha256_file(path: Path) -> str:
+    """流式计算文件的 SHA-256, 避免一次性读入大图片"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stat_key(path) -> tuple | None:
+    """文件的 (mtime_ns, size); 文件不存在时返回 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+@contextlib.contextmanager
+def atomic_write(path: Path, mode: str = "w"):
+    """
+    打开同目录下的临时文件供写入, with 块正常结束后原子地重命名为 path (保留已有文件的权限);
+    块内出错时删除临时文件, path 保持原样。写入中途被打断也不会留下截断的文件。
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, mode, encoding=None if "b" in mode else "utf-8") as f:
+            yield f
+        if path.exists():
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def memoize_by_stat(func):
+    """
+    以第一个参数 (文件路径) 的 mtime + size 为键缓存函数结果。
+    一次性的命令行调用中几乎没有开销; 在常驻的 paw daemon 中, 文件未改动时
+    直接复用上一次的解析结果, 改动后自动失效。返回值被所有调用方共享, 不应被修改。
+    """
+    memo = {}
+
+    @functools.wraps(func)
+    def wrapper(path, *args):
+        key = (str(path), args)
+        stamp = stat_key(path)
+        cached = memo.get(key)
+        if stamp is not None and cached is not None and cached[0] == stamp:
+            return cached[1]
+        value = func(path, *args)
+        memo[key] = (stamp, value)
+        return value
+
+    wrapper.cache_clear = memo.clear
+    return wrapper
+
+
+class BuildManifest:
+    """
+    保存在 output/ 下的构建清单。
+
+    记录每个编译目标上一次成功构建时的输入指纹, 同时缓存文件哈希与工具版本
+    (以 mtime + size 为键), 这样未改动的大文件不必每次重新计算哈希。
+    """
+    def __init__(self, output_dir: Path):
+        self.path = output_dir / MANIFEST_NAME
+        self.data = self._load()
+
+    def _load(self) -> dict:
+        empty = {"version": MANIFEST_VERSION, "targets": {}, "files": {}, "tools": {}}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return empty
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return empty
+        for key in ("targets", "files", "tools"):
+            data.setdefault(key, {})
+        return data
+
+    def save(self):
+        """原子地写回清单 (先写临时文件再重命名)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(self.path) as f:
+            json.dump(self.data, f, indent=1, sort_keys=True)
+
+    def file_hash(self, path: Path) -> str | None:
+        """返回文件内容哈希; 文件不存在时返回 None"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = str(path)
+        cached = self.data["files"].get(key)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        digest = sha256_file(path)
+        self.data["files"][key] = [st.st_mtime_ns, st.st_size, digest]
+        return digest
+
+    def tool_version(self, name_or_path: str) -> str:
+        """返回外部工具 `--version` 输出的首行, 以可执行文件的 mtime + size 缓存"""
+        exe = shutil.which(name_or_path) or name_or_path
+        try:
+            st = os.stat(exe)
+        except OSError:
+            return "missing"
+        cached = self.data["tools"].get(exe)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        try:
+            result = subprocess.run([exe, "--version"], capture_output=True, text=True, encoding="utf-8", timeout=30)
+            lines = (result.stdout or result.stderr).strip().splitlines()
+            version = lines[0] if lines else "unknown"
+        except Exception:
+            version = "unknown"
+        self.data["tools"][exe] = [st.st_mtime_ns, st.st_size, version]
+        return version
+
+    @staticmethod
+    def fingerprint(inputs: dict) -> str:
+        """把输入描述 (可 JSON 序列化) 归约为一个稳定的指纹"""
+        payload = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def is_fresh(self, target: str, fingerprint: str, output_path: Path) -> bool:
+        return output_path.exists() and self.data["targets"].get(target) == fingerprint
+
+    def record(self, target: str, fingerprint: str):
+        self.data["targets"][target] = fingerprint
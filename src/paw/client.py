@@ -0,0 +1,76 @@
+# PAW 命令行入口。这里只依赖标准库: 当 paw daemon 正在运行时, 常用命令直接转交给它执行,
+# 省去 Python 导入 Typer/Rich/ruamel.yaml 的启动开销; 否则在当前进程中照常执行。
+
+import json
+import os
+import socket
+import sys
+from .config import DAEMON_SOCKET
+
+# 转交给 daemon 执行的命令
+FORWARDED_COMMANDS = {"build", "b", "cite", "yinyong", "hunt", "woof"}
+# 长时间运行或自行启动子进程的模式仍在本地执行, 以免独占 daemon
+LOCAL_FLAGS = {"--watch", "-w", "--all"}
+PACKAGE_DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+def _forward(argv: list) -> int | None:
+    """把命令交给 daemon 执行并返回退出码; daemon 不可用时返回 None"""
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(str(DAEMON_SOCKET))
+    except OSError:
+        return None
+    with sock:
+        message = {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ), "package": PACKAGE_DIR}
+        try:
+            # 连同终端的 stdin/stdout/stderr 一起发送, daemon 直接读写当前终端
+            socket.send_fds(sock, [b"R"], [0, 1, 2])
+            sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        except OSError:
+            return None
+        reader = sock.makefile("rb")
+        while True:
+            try:
+                line = reader.readline()
+            except KeyboardInterrupt:
+                try:
+                    sock.sendall(b'{"signal": "interrupt"}\n')
+                except OSError:
+                    pass
+                continue
+            except OSError:
+                line = b""
+            if not line:
+                sys.stderr.write("paw: the daemon exited unexpectedly.\n")
+                return 1
+            reply = json.loads(line)
+            if reply.get("fallback"):
+                return None
+            if "exit" in reply:
+                return reply["exit"]
+
+
+def main():
+    argv = sys.argv[1:]
+    if argv and argv[0] == "__complete":
+        # Shell 补全: 只读预先生成的索引, 不导入 Typer/Rich
+        from .completion import main as complete
+        sys.exit(complete(argv[1:]))
+
+    if (
+        argv and argv[0] in FORWARDED_COMMANDS
+        and not LOCAL_FLAGS.intersection(argv)
+        and hasattr(socket, "send_fds")
+        and not os.environ.get("PAW_NO_DAEMON")
+    ):
+        code = _forward(argv)
+        if code is not None:
+            sys.exit(code)
+
+    from .main import main as run_paw
+    run_paw()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ import shutil
 from pathlib import Path
 from rich.console import Console
 from .. import utils
+from ..context import get_context
 
 app = typer.Typer(
     name="add",
@@ -19,8 +20,7 @@ def slugify(text: str) -> str:
     return text
 
 def _add_chapter_logic(title: str):
-    project_paths = utils.get_project_paths()
-    manuscript_dir = project_paths["manuscript"]
+    manuscript_dir = get_context().manuscript
     
     max_num = 0
     for f in manuscript_dir.glob("*.md"):
@@ -55,8 +55,7 @@ def add_chapter_alias_zhang(title: str = typer.Argument(..., help="新章节的
 
 
 def _add_figure_logic(source_path: Path, caption: str | None):
-    project_paths = utils.get_project_paths()
-    figures_dir = project_paths["figures"]
+    figures_dir = get_context().figures
 
     dest_path = figures_dir / source_path.name
     if dest_path.exists():
@@ -99,8 +98,7 @@ def _add_bib_logic(source_path: Path):
         console.print(f"[bold red]Error:[/bold] File must be a '.bib' file.")
         raise typer.Exit(1)
 
-    project_paths = utils.get_project_paths()
-    resources_dir = project_paths["resources"]
+    resources_dir = get_context().resources
     
     dest_path = resources_dir / source_path.name
     if dest_path.exists():
@@ -116,7 +114,7 @@ def _add_bib_logic(source_path: Path):
         raise typer.Exit(1)
 
     relative_path = f"resources/{dest_path.name}"
-    utils.update_yaml_list(project_paths["frontmatter"], "bibliography", relative_path)
+    utils.update_yaml_key(get_context().metadata_path, "bibliography", relative_path)
 
 @app.command("bib", help="添加一个 .bib 参考文献文件。 Alias: 'wenxian'.")
 def add_bib(source_path: Path = typer.Argument(..., help="源 .bib 文件的路径。", exists=True, file_okay=True, dir_okay=False, readable=True)):
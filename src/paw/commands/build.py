@@ -1,111 +1,1164 @@
 import typer
 import subprocess
 import re
+import fnmatch
+import os
+import json
+import hashlib
+import shutil
+import signal
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from typing import Optional
 from rich.console import Console
-from .. import utils
+from rich.markup import escape
+from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+from rich.table import Table
+from .. import config, figures, manuscript, utils
+from ..bibtex import extract_entries, find_citation_keys
+from ..cache import BuildManifest, atomic_write
+from ..context import ProjectContext, get_context
+from ..diagnostics import Diagnostic, OutputParser
+from ..profiling import BuildProfile, parse_engine_log
+from ..watch import create_watcher
 from pathlib import Path
 
 console = Console()
 
-def get_chapters(project_paths):
-    """根据 input-files 逻辑决定章节列表"""
-    metadata_path = project_paths["metadata"]
+# 正在运行的 Pandoc 子进程, 供 watch 模式在新改动到来时中止旧的构建
+_active_processes = set()
+_process_lock = threading.Lock()
+_cancel_event = threading.Event()
+# 当前构建的性能分析记录 (仅在 --profile 时启用)
+_profile: BuildProfile | None = None
+# 新建文件的默认权限; umask 只能通过设置来读取, 在导入时 (尚无其他线程) 读一次
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _chapter_matches(chapter: Path, selector: str, ctx: ProjectContext) -> bool:
+    if selector.isdigit():
+        # 按章节编号匹配: 3 与 03 都能选中 03-methods.md
+        number = re.match(r"\d+", chapter.name)
+        return bool(number) and int(number.group()) == int(selector)
+    if any(char in selector for char in "*?["):
+        try:
+            relative = chapter.relative_to(ctx.root).as_posix()
+        except ValueError:
+            relative = chapter.as_posix()
+        return fnmatch.fnmatch(chapter.name, selector) or fnmatch.fnmatch(relative, selector)
+    candidates = [Path.cwd() / selector, ctx.root / selector, ctx.manuscript / selector]
+    return chapter.name == selector or chapter.stem == selector or any(c.resolve() == chapter.resolve() for c in candidates)
+
+
+def select_chapters(chapters: list, selectors: list, ctx: ProjectContext) -> list:
+    """--only 的章节选择: 编号 (3 或 03)、通配符 (*method*) 或路径, 保持原有的章节顺序"""
+    return [c for c in chapters if any(_chapter_matches(Path(c), s, ctx) for s in selectors)]
+
+
+# 输出格式到文件扩展名的映射; 未列出的格式直接以格式名作扩展名
+WRITER_EXTENSIONS = {
+    "latex": "tex",
+    "beamer": "tex",
+    "markdown": "md",
+    "gfm": "md",
+    "commonmark": "md",
+    "html5": "html",
+    "plain": "txt",
+    "asciidoc": "adoc",
+}
+
+
+# 可以由 PAW 直接驱动的 LaTeX 引擎 (incremental-pdf 模式)
+LATEX_ENGINES = {"xelatex", "lualatex", "pdflatex"}
+# 决定是否需要再跑一遍 LaTeX 的辅助文件
+LATEX_AUX_SUFFIXES = (".aux", ".toc", ".lof", ".lot", ".out")
+MAX_LATEX_PASSES = 5
+
+# pandoc-crossref 的结果取决于输出格式 (LaTeX 输出使用原生的 \label/\ref、图表标题与公式环境),
+# 因此前端阶段按输出格式族各缓存一份 AST: 族名 -> 交给 pandoc-crossref 的格式
+CROSSREF_FAMILIES = {"latex": "latex", "default": "json"}
+LATEX_WRITERS = {"pdf", "latex", "beamer"}
+
+# 前端阶段输出 JSON, Pandoc 交给 -F 过滤器的格式总是 "json";
+# 这个 Lua 过滤器改为以 paw-crossref-format 指定的格式运行 pandoc-crossref
+CROSSREF_FILTER = """\
+-- Generated by PAW: run pandoc-crossref for the writer family given in paw-crossref-format
+function Pandoc(doc)
+  local format = doc.meta["paw-crossref-format"]
+  doc.meta["paw-crossref-format"] = nil
+  format = format and pandoc.utils.stringify(format) or FORMAT
+  return pandoc.utils.run_json_filter(doc, "pandoc-crossref", {format})
+end
+"""
+# 子进程输出只在内存中保留最后这么多行, 用于出错时展示
+OUTPUT_TAIL_LINES = 200
+
+
+def _as_list(value) -> list:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return [str(v) for v in value]
+
+
+def writer_family(output_format: str) -> str:
+    return "latex" if output_format in LATEX_WRITERS else "default"
+
+
+def _crossref_filter(ctx: ProjectContext) -> Path:
+    """把 CROSSREF_FILTER 写到 output/.cache/crossref.lua (内容不变时不重写)"""
+    path = ctx.output / ".cache" / "crossref.lua"
+    if not path.exists() or path.read_text(encoding="utf-8") != CROSSREF_FILTER:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        utils.atomic_write_text(path, CROSSREF_FILTER)
+    return path
+
+
+def _resource_path_arg(ctx: ProjectContext) -> str:
+    return f"--resource-path={ctx.root}:{ctx.resources}:{utils.config.CSL_DIR}:{utils.config.TEMPLATES_DIR}"
+
+
+def _file_entry(manifest: BuildManifest, path: Path, ctx: ProjectContext) -> list:
     try:
-        data = utils.read_yaml_file(metadata_path)
-        input_files = data.get("input-files")
-        
-        if input_files and isinstance(input_files, list):
-            manual_chapters = [str(project_paths["root"] / file) for file in input_files]
-            return manual_chapters
-    except Exception:
-        pass
+        label = str(path.relative_to(ctx.root))
+    except ValueError:
+        label = str(path)
+    return [label, manifest.file_hash(path)]
 
-    auto_chapters = sorted(project_paths["manuscript"].glob("[0-9]*.md"))
-    return [str(p) for p in auto_chapters]
 
+def _resource_entry(manifest: BuildManifest, name: str, ctx: ProjectContext) -> list:
+    resolved = ctx.resolve_resource(name)
+    return _file_entry(manifest, resolved, ctx) if resolved else [name, None]
 
-def run_pandoc(output_format: str, project_paths):
-    """运行 Pandoc 命令的核心逻辑 (最终版)"""
-    console.print(f" brewing [bold blue]{output_format.upper()}[/bold blue]...")
-    
-    output_dir = project_paths["output"]
-    output_dir.mkdir(exist_ok=True)
-    
-    doc_name = "paper"
-    output_path = output_dir / f"{doc_name}.{output_format}"
-    
-    chapters = get_chapters(project_paths)
-    if not chapters:
-        console.print("[bold red]Error:[/bold red] No chapter files found.")
+
+def parse_chapters(chapters: list, ctx: ProjectContext, manifest: BuildManifest, prune: bool = True) -> list:
+    """
+    把每个章节单独解析为 Pandoc JSON AST, 以内容哈希为键缓存在 output/.cache/chapters。
+    只有内容变化的章节需要重新解析, 解析工作在各自的 Pandoc 子进程中并行进行。
+    预览构建只包含部分章节, 此时 prune=False, 保留其余章节的缓存。
+    """
+    cache_dir = ctx.output / ".cache" / "chapters"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    pandoc_exec = utils.get_pandoc_path()
+    pandoc_version = manifest.tool_version(pandoc_exec)
+
+    ast_paths, pending = [], []
+    for chapter in chapters:
+        content_hash = manifest.file_hash(Path(chapter))
+        if content_hash is None:
+            console.print(f"[bold red]Error:[/bold red] Chapter file not found: {chapter}")
+            raise typer.Exit(1)
+        # 输入格式由扩展名推断, 因此扩展名与 Pandoc 版本一起参与缓存键
+        key = hashlib.sha256(f"{content_hash}:{Path(chapter).suffix}:{pandoc_version}".encode("utf-8")).hexdigest()[:32]
+        ast_path = cache_dir / f"{key}.json"
+        ast_paths.append(ast_path)
+        if not ast_path.exists():
+            pending.append((chapter, ast_path))
+
+    started = time.perf_counter()
+    if pending:
+        console.print(f" parsing {len(pending)} of {len(chapters)} chapter(s)...")
+        with ThreadPoolExecutor(max_workers=min(len(pending), os.cpu_count() or 1)) as pool, _cancel_on_interrupt():
+            futures = [pool.submit(_run_to_temp, [pandoc_exec, "-t", "json", chapter], ast_path) for chapter, ast_path in pending]
+            for (chapter, _), future in zip(pending, futures):
+                result = future.result()
+                if result["cancelled"]:
+                    raise typer.Exit(1)
+                _print_diagnostics(result["diagnostics"], Path(chapter).name)
+                if not result["ok"]:
+                    _print_failure(result, f"Parsing {Path(chapter).name}")
+                    raise typer.Exit(1)
+
+    _profile_add("parse chapters", time.perf_counter() - started, parsed=len(pending), cached=len(chapters) - len(pending))
+
+    # 清理不再被任何章节引用的旧缓存
+    if prune:
+        current = set(ast_paths)
+        for stale in cache_dir.glob("*.json"):
+            if stale not in current:
+                stale.unlink()
+    return ast_paths
+
+
+def assemble_chapters(ast_paths: list, output_path: Path):
+    """按章节顺序拼接各章节的 AST (规则见 manuscript.assemble)"""
+    chapter_asts = []
+    for ast_path in ast_paths:
+        with open(ast_path, "r", encoding="utf-8") as f:
+            chapter_asts.append(json.load(f))
+    with atomic_write(output_path) as f:
+        json.dump(manuscript.assemble(chapter_asts), f, ensure_ascii=False)
+
+
+def _needs_combined_parse(chapters: list) -> bool:
+    """章节之间引用了彼此定义的引用链接或脚注时, 只能把全部章节交给一次 Pandoc 解析"""
+    texts = []
+    for chapter in chapters:
+        try:
+            texts.append(Path(chapter).read_text(encoding="utf-8", errors="replace"))
+        except OSError:
+            return False  # 缺失的章节由 parse_chapters 报错
+    return manuscript.has_cross_chapter_references(texts)
+
+
+def parse_combined(chapters: list, output_path: Path):
+    """把全部章节一次性解析为一份 AST (不使用按章节的缓存)"""
+    console.print(f" parsing {len(chapters)} chapter(s) together [dim](reference links or footnotes span chapters)[/dim]...")
+    started = time.perf_counter()
+    with _cancel_on_interrupt():
+        result = _run_to_temp([utils.get_pandoc_path(), "-t", "json"] + [str(c) for c in chapters], output_path)
+    if result["cancelled"]:
         raise typer.Exit(1)
-        
+    _print_diagnostics(result["diagnostics"], "manuscript")
+    if not result["ok"]:
+        _print_failure(result, "Parsing chapters")
+        raise typer.Exit(1)
+    _profile_add("parse chapters (combined)", time.perf_counter() - started, chapters=len(chapters))
+
+
+def _metadata_strings(value):
+    """递归取出元数据中的全部字符串值"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _metadata_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _metadata_strings(item)
+
+
+def plan_bibliography(ctx: ProjectContext, chapters: list, data: dict, manifest: BuildManifest, cache_name: str = "bibliography", prune: bool = True) -> dict | None:
+    """
+    引文预处理: 只保留正文与元数据中实际引用的条目, 并预先转换为 CSL-JSON 交给 citeproc,
+    省去每次构建都重新解析整个 (可能上万条的) BibTeX 文件。
+    缓存文件以 .bib 内容哈希与被引用 key 的集合为键。
+    无法安全裁剪时 (非 BibTeX 文献库、文件缺失、nocite: '@*') 返回 None, 由 Pandoc 原样处理。
+    """
+    names = _as_list(data.get("bibliography"))
+    nocite = str(data.get("nocite") or "")
+    if not names or "@*" in nocite:
+        return None
+    sources = []
+    for name in names:
+        resolved = ctx.resolve_resource(name)
+        if resolved is None or resolved.suffix.lower() not in (".bib", ".bibtex"):
+            return None
+        sources.append(resolved)
+
+    # citeproc 同样处理元数据中的引用 (例如模板的 abstract 字段), 连同 nocite 一起保留
+    keys = set()
+    for text in _metadata_strings(data):
+        keys.update(find_citation_keys(text))
+    known = manifest.data.get("citations", {})
+    citations = {}
+    for chapter in chapters:
+        content_hash = manifest.file_hash(Path(chapter))
+        if content_hash is None:
+            continue  # 缺失的章节由 parse_chapters 报错
+        if content_hash in known:
+            citations[content_hash] = known[content_hash]
+        else:
+            text = Path(chapter).read_text(encoding="utf-8", errors="replace")
+            citations[content_hash] = sorted(find_citation_keys(text))
+        keys.update(citations[content_hash])
+    # 只保留当前章节的记录, 以免 watch 模式下随编辑无限增长; 预览构建只包含部分章节, 不做清理
+    manifest.data["citations"] = citations if prune else {**known, **citations}
+
     pandoc_exec = utils.get_pandoc_path()
+    digest = manifest.fingerprint({
+        "sources": [[str(p), manifest.file_hash(p)] for p in sources],
+        "keys": sorted(keys),
+        "pandoc": manifest.tool_version(pandoc_exec),
+    })
+    path = ctx.output / ".cache" / cache_name / f"{digest[:32]}.json"
+    return {"path": path, "sources": sources, "keys": keys, "pandoc": pandoc_exec}
+
+
+def build_bibliography(bibliography: dict):
+    """抽取被引用的条目并用 Pandoc 转换为 CSL-JSON"""
+    path = bibliography["path"]
+    cache_dir = path.parent
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    # .bib 按 biblatex 解析, .bibtex 按 bibtex 解析, 与 citeproc 的行为一致
+    groups = {}
+    for source in bibliography["sources"]:
+        reader = "bibtex" if source.suffix.lower() == ".bibtex" else "biblatex"
+        text = source.read_text(encoding="utf-8", errors="replace")
+        chunk, _found = extract_entries(text, bibliography["keys"])
+        groups.setdefault(reader, []).append(chunk)
 
-    # (最终版) 这是最可靠的构建方式
+    entries = []
+    for reader, chunks in groups.items():
+        pruned_path = cache_dir / f"{path.stem}.{reader}.bib"
+        pruned_path.write_text("\n".join(chunks), encoding="utf-8")
+        json_path = cache_dir / f"{path.stem}.{reader}.json"
+        result = _run_to_temp([bibliography["pandoc"], "-f", reader, "-t", "csljson", str(pruned_path)], json_path)
+        pruned_path.unlink()
+        if result["cancelled"]:
+            raise typer.Exit(1)
+        if not result["ok"]:
+            _print_failure(result, "Converting bibliography")
+            raise typer.Exit(1)
+        with open(json_path, "r", encoding="utf-8") as f:
+            entries.extend(json.load(f))
+        json_path.unlink()
+
+    with atomic_write(path) as f:
+        json.dump(entries, f, ensure_ascii=False)
+
+    # 只保留当前这一份裁剪结果
+    for stale in cache_dir.glob("*.json"):
+        if stale != path:
+            stale.unlink()
+
+
+def prepare_front(ctx: ProjectContext, chapters: list, data: dict, manifest: BuildManifest, family: str = "default", preview: bool = False) -> dict:
+    """
+    前端阶段: 拼接各章节的 AST 并运行 pandoc-crossref 与 citeproc, 产出完整文档的 Pandoc JSON AST。
+    同一输出格式族 (见 CROSSREF_FAMILIES) 的所有格式共用一份 AST, 过滤器与引文处理每族只需运行一次。
+    预览构建 (--only) 使用独立的缓存文件, 不会覆盖完整构建的中间结果。
+    """
+    cache_dir = ctx.output / ".cache"
+    ast_path = cache_dir / f"{'preview' if preview else 'paper'}.{family}.json"
+    manuscript_path = cache_dir / ("preview-manuscript.json" if preview else "manuscript.json")
     command = [
-        pandoc_exec,
-        f"--resource-path={project_paths['root']}:{project_paths['resources']}:{utils.config.CSL_DIR}:{utils.config.TEMPLATES_DIR}",
-        "--metadata-file", str(project_paths["metadata"]),
-        "-F", "pandoc-crossref",
+        utils.get_pandoc_path(),
+        _resource_path_arg(ctx),
+        "--metadata-file", str(ctx.metadata_path),
+        "-M", f"paw-crossref-format={CROSSREF_FAMILIES[family]}",
+        "-L", str(_crossref_filter(ctx)),
         "--citeproc",
+        "-f", "json",
+        "-t", "json",
     ]
+    bibliography = plan_bibliography(ctx, chapters, data, manifest, "bibliography-preview" if preview else "bibliography", prune=not preview)
+    if bibliography:
+        # 命令行上的 --bibliography 会覆盖 metadata.yaml 中的 bibliography
+        command.extend(["--bibliography", str(bibliography["path"])])
+    command.append(str(manuscript_path))
+
+    inputs = {
+        # 可执行文件路径与输出路径不影响产物内容, 不计入指纹
+        "arguments": command[1:],
+        "chapters": [_file_entry(manifest, Path(c), ctx) for c in chapters],
+        "metadata": _file_entry(manifest, ctx.metadata_path, ctx),
+        "resources": [_resource_entry(manifest, name, ctx) for name in _as_list(data.get("bibliography")) + _as_list(data.get("csl"))],
+        "crossref-filter": hashlib.sha256(CROSSREF_FILTER.encode("utf-8")).hexdigest(),
+        "tools": {
+            "pandoc": manifest.tool_version(command[0]),
+            "pandoc-crossref": manifest.tool_version("pandoc-crossref"),
+        },
+    }
+    return {
+        "family": family,
+        "command": command,
+        "chapters": chapters,
+        "bibliography": bibliography,
+        "ast_path": ast_path,
+        "manuscript_path": manuscript_path,
+        "preview": preview,
+        "fingerprint": manifest.fingerprint(inputs),
+    }
+
+
+def run_fronts(fronts: list, ctx: ProjectContext, manifest: BuildManifest, force: bool = False):
+    """
+    在需要时运行各输出格式族的前端阶段, 生成 (或复用) output/.cache 中的 AST。
+    参考文献裁剪、章节解析与拼接由各族共享, 只做一次。
+    """
+    stale = []
+    for front in fronts:
+        ast_path = front["ast_path"]
+        if not force and manifest.is_fresh(f".cache/{ast_path.name}", front["fingerprint"], ast_path):
+            label = f" ({front['family']} writers)" if len(fronts) > 1 else ""
+            console.print(f"⚡ [cyan]Cache hit:[/cyan] reusing parsed document AST{label}.")
+            _profile_add(f"front: {front['family']}", 0.0, cache="hit")
+        else:
+            stale.append(front)
+    if not stale:
+        return
+
+    first = stale[0]
+    bibliography = first["bibliography"]
+    if bibliography and not bibliography["path"].exists():
+        console.print(f" extracting {len(bibliography['keys'])} cited reference key(s) to CSL-JSON...")
+        started = time.perf_counter()
+        build_bibliography(bibliography)
+        _profile_add("bibliography: prune + CSL-JSON", time.perf_counter() - started, keys=len(bibliography["keys"]))
+
+    if _needs_combined_parse(first["chapters"]):
+        parse_combined(first["chapters"], first["manuscript_path"])
+    else:
+        chapter_asts = parse_chapters(first["chapters"], ctx, manifest, prune=not first["preview"])
+        started = time.perf_counter()
+        assemble_chapters(chapter_asts, first["manuscript_path"])
+        _profile_add("assemble chapter ASTs", time.perf_counter() - started, chapters=len(chapter_asts))
+
+    for front in stale:
+        _run_front(front, manifest, len(fronts) > 1)
+
+
+def _run_front(front: dict, manifest: BuildManifest, label_family: bool):
+    ast_path = front["ast_path"]
+    family = f" for {front['family']} writers" if label_family else ""
+    started = time.perf_counter()
+    with console.status(f" resolving references{family} [dim](crossref + citeproc)[/dim]...") as spinner:
+        status = lambda text: spinner.update(f" resolving references{family} [dim]({text})[/dim]...")
+        result = _run_to_temp(_verbose(front["command"]), ast_path, status)
+    if result["cancelled"]:
+        raise typer.Exit(1)
+    if _profile:
+        _profile.add_pandoc_log(f"front: {front['family']}", result["output"], time.perf_counter() - started)
+    diagnostics = _collapse_placeholders(result["diagnostics"]) if front["preview"] else result["diagnostics"]
+    _print_diagnostics(diagnostics, "references")
+    if not result["ok"]:
+        _print_failure(result, "Resolving references")
+        raise typer.Exit(1)
+    manifest.record(f".cache/{ast_path.name}", front["fingerprint"])
+
+
+def prepare_target(output_format: str, ctx: ProjectContext, front: dict, data: dict, manifest: BuildManifest, force: bool = False) -> dict | None:
+    """后端阶段: 为一个输出格式组装从 AST 渲染的 Pandoc 命令; 命中构建缓存时返回 None"""
+    extension = WRITER_EXTENSIONS.get(output_format, output_format)
+    output_path = ctx.output / f"{'preview-paper' if front['preview'] else 'paper'}.{extension}"
+
+    pdf_engine = str(data.get("pdf-engine", "xelatex"))
+    # incremental-pdf: 由 PAW 在持久化的 output/.latex 中驱动 LaTeX 引擎
+    incremental = output_format == "pdf" and bool(data.get("incremental-pdf")) and pdf_engine in LATEX_ENGINES
+
+    command = [utils.get_pandoc_path(), _resource_path_arg(ctx), "-f", "json"]
+    if incremental:
+        command.extend(["-t", "latex", "--standalone"])
+    elif output_format != "pdf":
+        command.extend(["-t", output_format])
 
     # --- 关键修复：从 metadata.yaml 读取并应用模板和PDF引擎 ---
-    try:
-        data = utils.read_yaml_file(project_paths["metadata"])
-        if output_format == "docx":
-            template_file = data.get("reference-doc")
-            if template_file:
-                # Pandoc会利用resource-path自动寻找,我们只需提供文件名或相对/绝对路径
-                command.extend(["--reference-doc", template_file])
-        
-        if output_format == "pdf":
-            pdf_engine = data.get("pdf-engine", "xelatex")
+    resources = []
+    if output_format == "docx":
+        template_file = data.get("reference-doc")
+        if template_file:
+            # Pandoc会利用resource-path自动寻找,我们只需提供文件名或相对/绝对路径
+            command.extend(["--reference-doc", template_file])
+            resources.append(_resource_entry(manifest, str(template_file), ctx))
+
+    tools = {}
+    if output_format == "pdf":
+        if not incremental:
             command.extend([f"--pdf-engine={pdf_engine}"])
-    except Exception:
-        # 如果 YAML 解析失败, 使用默认的 pdf-engine
-        if output_format == "pdf":
-             command.extend(["--pdf-engine=xelatex"])
+        tools["pdf-engine"] = manifest.tool_version(pdf_engine)
     # --- 修复结束 ---
 
-    command.extend(["-o", str(output_path)])
-    command.extend(chapters)
+    # 需要图片预处理的格式从各自改写过图片引用的 AST 渲染
+    figure_profile = figures.figure_profile(output_format)
+    if figure_profile:
+        command.append(str(front["ast_path"].with_name(f"{front['ast_path'].stem}.{figure_profile}.json")))
+        tools.update(figures.converter_versions(manifest))
+    else:
+        command.append(str(front["ast_path"]))
+
+    figures_dir = ctx.figures
+    figure_files = sorted(p for p in figures_dir.rglob("*") if p.is_file()) if figures_dir.is_dir() else []
+    inputs = {
+        "front": front["fingerprint"],
+        "format": output_format,
+        "arguments": command[1:],
+        "incremental": incremental,
+        "resources": resources,
+        "figures": [_file_entry(manifest, p, ctx) for p in figure_files],
+        "figure-dpi": figure_dpi(data) if figure_profile else None,
+        "tools": tools,
+    }
+    fingerprint = manifest.fingerprint(inputs)
+    if not force and manifest.is_fresh(output_path.name, fingerprint, output_path):
+        console.print(f"⚡ [cyan]Cache hit:[/cyan] {output_path.name} is up to date, skipping.")
+        _profile_add(f"render {output_format}", 0.0, cache="hit")
+        return None
+    console.print(f"   [dim]Cache miss: {output_path.name} needs rebuilding.[/dim]")
 
+    target = {
+        "format": output_format,
+        "command": command,
+        "output_path": output_path,
+        "fingerprint": fingerprint,
+        "figures": figure_profile,
+        "front": front,
+        "preview": front["preview"],
+    }
+    if incremental:
+        latex_dir = ctx.output / (".latex-preview" if front["preview"] else ".latex")
+        target["latex"] = {"engine": pdf_engine, "dir": latex_dir, "root": ctx.root, "resources": ctx.resources}
+    return target
+
+
+def figure_dpi(data: dict) -> int:
+    """metadata.yaml 中的 figure-dpi, 决定位图的最大像素与 SVG 栅格化的分辨率"""
+    value = data.get("figure-dpi", figures.DEFAULT_DPI)
     try:
-        result = subprocess.run(command, capture_output=True, text=True, check=True, encoding='utf-8')
-        if result.stderr:
-            warnings = [line for line in result.stderr.splitlines() if "warning" in line.lower()]
-            if warnings:
-                console.print("[yellow]Pandoc Warnings:[/yellow]")
-                for warning in warnings:
-                    console.print(f"  {warning}")
-        console.print(f"✅ [bold green]Successfully created {output_path}[/bold green]")
-    except subprocess.CalledProcessError as e:
-        console.print(f"[bold red]Pandoc Error (Exit Code {e.returncode}):[/bold red]")
-        console.print(e.stderr)
-        raise typer.Exit(1)
+        return int(value)
+    except (TypeError, ValueError):
+        console.print(f"[bold yellow]Warning:[/bold yellow] Invalid figure-dpi '{value}', using {figures.DEFAULT_DPI}.")
+        return figures.DEFAULT_DPI
+
+
+def _resolve_figure(url: str, ctx: ProjectContext) -> Path | None:
+    """按照 Pandoc 查找图片的顺序 (当前目录, 再 --resource-path) 定位本地图片文件"""
+    if "://" in url or url.startswith("data:"):
+        return None
+    candidate = Path(url)
+    if candidate.is_absolute():
+        return candidate if candidate.is_file() else None
+    for directory in (Path.cwd(), ctx.root, ctx.resources):
+        if (directory / candidate).is_file():
+            return directory / candidate
+    return None
+
+
+def run_figures(profile_fronts: dict, ctx: ProjectContext, data: dict, manifest: BuildManifest):
+    """
+    图片预处理阶段: 按各输出格式的方案把 SVG 转为 PDF/PNG, 把过大或不受支持的位图
+    缩小并转为 PNG/JPEG。转换结果以 (源文件内容哈希, 转换方式, DPI, 工具版本) 为键
+    缓存在 output/.cache/figures, 命中时完全跳过; 未命中的转换在多个进程中并行执行。
+    profile_fronts 为 方案 -> 使用该方案的目标所在的前端阶段; 最后为每个方案写出一份
+    改写了图片引用的 AST (如 output/.cache/paper.latex.latex.json)。
+    """
+    started = time.perf_counter()
+    profiles = set(profile_fronts)
+    preview = any(front["preview"] for front in profile_fronts.values())
+    documents = {}
+    sources = {}
+    for front in profile_fronts.values():
+        if front["ast_path"] in documents:
+            continue
+        with open(front["ast_path"], "r", encoding="utf-8") as f:
+            documents[front["ast_path"]] = document = json.load(f)
+        for url in figures.collect_images(document):
+            resolved = _resolve_figure(url, ctx)
+            if resolved:
+                sources[url] = resolved
+
+    cache_dir = ctx.output / ".cache" / "figures"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    dpi = figure_dpi(data)
+    versions = figures.converter_versions(manifest)
+    known_sizes = manifest.data.get("figure-sizes", {})
+    # 完整构建顺便丢弃已不再使用的尺寸记录, 预览只看到部分图片, 全部保留
+    sizes = manifest.data["figure-sizes"] = known_sizes if preview else {}
+    mappings = {profile: {} for profile in profiles}
+    pending = {}
+    needs_pillow = False
+    for url, source in sources.items():
+        content_hash = manifest.file_hash(source)
+        info = None
+        if source.suffix.lower() in figures.RASTER_SUFFIXES:
+            # 位图尺寸只取决于文件内容, 按内容哈希记住, 避免每次构建都打开文件头
+            if content_hash not in known_sizes:
+                known_sizes[content_hash] = figures.raster_info(source)
+            info = sizes[content_hash] = known_sizes[content_hash]
+            needs_pillow = needs_pillow or figures.Image is None
+        for profile in profiles:
+            job = figures.plan_conversion(source, content_hash, profile, dpi, info, cache_dir, versions)
+            if job is None:
+                continue
+            mappings[profile][url] = job["output"]
+            if not Path(job["output"]).exists():
+                pending[job["output"]] = (url, job)
+
+    if needs_pillow:
+        console.print("   [dim]Raster figures are embedded as-is; install 'paw-cli[figures]' (Pillow) to resize and convert them.[/dim]")
+    if pending:
+        console.print(f" converting {len(pending)} figure(s)...")
+        with ProcessPoolExecutor(max_workers=min(len(pending), os.cpu_count() or 1)) as pool:
+            jobs = list(pending.values())
+            for (url, job), error in zip(jobs, pool.map(figures.convert_figure, [job for _, job in jobs])):
+                if error:
+                    # 转换失败时保留原始引用, 由 Pandoc 按原样处理
+                    console.print(f"[bold yellow]Warning:[/bold yellow] Could not convert figure '{escape(url)}': {escape(error)}")
+                    for mapping in mappings.values():
+                        if mapping.get(url) == job["output"]:
+                            del mapping[url]
+
+    for profile, mapping in mappings.items():
+        front = profile_fronts[profile]
+        document = documents[front["ast_path"]]
+        rewritten = json.loads(json.dumps(document)) if mapping else document
+        figures.rewrite_images(rewritten, mapping)
+        ast_path = front["ast_path"].with_name(f"{front['ast_path'].stem}.{profile}.json")
+        with atomic_write(ast_path) as f:
+            json.dump(rewritten, f, ensure_ascii=False)
+
+    # 清理不再被引用的转换结果; 其他方案上次用到的文件也保留, 以免交替编译不同格式时反复转换
+    used = manifest.data.setdefault("figures", {})
+    for profile, mapping in mappings.items():
+        front = profile_fronts[profile]
+        used[f"{front['ast_path'].stem}.{profile}"] = sorted(Path(output).name for output in mapping.values())
+    keep = {name for names in used.values() for name in names}
+    for stale in cache_dir.iterdir():
+        if stale.name not in keep and not stale.name.startswith("."):
+            stale.unlink()
+    _profile_add("figures", time.perf_counter() - started, images=len(sources), converted=len(pending))
+
+
+def _profile_add(stage: str, seconds: float, **details):
+    if _profile:
+        _profile.add(stage, seconds, **details)
+
+
+def _verbose(command: list) -> list:
+    """分析模式下让 Pandoc 输出过滤器计时等详细日志"""
+    return command + ["--verbose"] if _profile else command
+
+
+def _terminate(proc: subprocess.Popen):
+    try:
+        if os.name == "posix":
+            # Pandoc 会再启动 LaTeX 引擎, 因此终止整个进程组
+            os.killpg(proc.pid, signal.SIGTERM)
+        else:
+            proc.terminate()
+    except OSError:
+        pass
+
+
+def cancel_builds():
+    """中止当前进程中所有正在运行的编译子进程"""
+    _cancel_event.set()
+    with _process_lock:
+        for proc in list(_active_processes):
+            _terminate(proc)
+
+
+@contextmanager
+def _cancel_on_interrupt():
+    """
+    编译子进程在独立的会话中运行, 收不到终端的 Ctrl+C。主线程被打断时先中止它们,
+    否则线程池退出时会一直等到它们跑完, 而 paw 退出后它们会成为孤儿进程。
+    """
+    try:
+        yield
+    except KeyboardInterrupt:
+        cancel_builds()
+        raise
+
+
+def _run_process(command: list, cwd: Path | None = None, env: dict | None = None, on_line=None) -> subprocess.CompletedProcess | None:
+    """
+    运行一个可被 cancel_builds() 中止的子进程, 把 stdout/stderr 合并后逐行交给 on_line。
+    on_line 返回 True 表示遇到致命错误, 立即终止该子进程而不是等它跑完。
+    返回的 stdout 只包含最后 OUTPUT_TAIL_LINES 行 (分析模式下保留全部); 被中止时返回 None。
+    """
+    if _cancel_event.is_set():
+        return None
+    proc = subprocess.Popen(
+        command, cwd=cwd, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', errors='replace',
+        start_new_session=(os.name == "posix"),
+    )
+    with _process_lock:
+        _active_processes.add(proc)
+    tail = deque(maxlen=None if _profile else OUTPUT_TAIL_LINES)
+    aborted = False
+    try:
+        for line in proc.stdout:
+            tail.append(line.rstrip("\n"))
+            if on_line and on_line(line) and not aborted:
+                aborted = True
+                _terminate(proc)
+        proc.wait()
+    except BaseException:
+        # 本线程被打断 (例如在主线程中运行时按下 Ctrl+C): 不留下仍在运行的子进程
+        _terminate(proc)
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        raise
+    finally:
+        with _process_lock:
+            _active_processes.discard(proc)
+    if _cancel_event.is_set():
+        return None
+    return subprocess.CompletedProcess(command, proc.returncode, "\n".join(tail), None)
+
+
+def _stream_handler(parser: OutputParser, status=None, label: str = ""):
+    """把输出行交给诊断解析器, 并在发现新问题或新一遍编译时刷新进度显示"""
+    def on_line(line: str) -> bool:
+        passes = parser.passes
+        diagnostic = parser.feed(line)
+        if status and (diagnostic or parser.passes != passes):
+            problems = len(parser.diagnostics)
+            pass_info = f"pass {parser.passes}, " if parser.passes else ""
+            status(f"{label}{pass_info}{problems} diagnostic(s)")
+        return bool(diagnostic and diagnostic.fatal)
+    return on_line
+
+
+def _match_mode(tmp_path: Path, output_path: Path):
+    """mkstemp 创建的文件权限为 0600: 改为已有输出文件的权限, 没有时使用 umask 决定的默认权限"""
+    if output_path.exists():
+        shutil.copymode(output_path, tmp_path)
+    else:
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+
+
+def _run_to_temp(command: list, output_path: Path, status=None, parser: OutputParser | None = None) -> dict:
+    """
+    运行 Pandoc 并输出到同目录的临时文件, 成功后再原子地重命名为最终文件,
+    因此中途失败或被打断都不会留下半截的输出。输出被实时解析为结构化诊断。
+    """
+    parser = parser or OutputParser()
+    result = {"output_path": output_path, "ok": False, "diagnostics": parser.diagnostics, "output": "", "error": None, "cancelled": False}
+    fd, tmp_name = tempfile.mkstemp(dir=output_path.parent, prefix=f".{output_path.stem}-", suffix=output_path.suffix)
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        proc = _run_process(command + ["-o", str(tmp_path)], on_line=_stream_handler(parser, status, "rendering, "))
+        if proc is None:
+            result.update(error="Build cancelled.", cancelled=True)
+            return result
+        result["output"] = proc.stdout
+        if proc.returncode != 0:
+            result["error"] = f"Pandoc Error (Exit Code {proc.returncode})"
+            return result
+        _match_mode(tmp_path, output_path)
+        os.replace(tmp_path, output_path)
+        result["ok"] = True
     except FileNotFoundError:
-        console.print(f"[bold red]Error:[/bold red] '{pandoc_exec}' command not found. Please run 'paw check'.")
+        result["error"] = f"'{command[0]}' command not found. Please run 'paw check'."
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return result
+
+
+def _aux_state(latex_dir: Path, job_name: str) -> dict:
+    state = {}
+    for suffix in LATEX_AUX_SUFFIXES:
+        aux_path = latex_dir / f"{job_name}{suffix}"
+        if aux_path.exists():
+            state[suffix] = hashlib.sha256(aux_path.read_bytes()).hexdigest()
+    return state
+
+
+def _remove_aux(latex_dir: Path, job_name: str):
+    """引擎中途失败或被中止时辅助文件可能只写了一半, 删除它们, 下次从头编译而不是复用坏文件"""
+    for suffix in LATEX_AUX_SUFFIXES:
+        aux_path = latex_dir / f"{job_name}{suffix}"
+        if aux_path.exists():
+            aux_path.unlink()
+
+
+def run_latex(target: dict, status=None) -> dict:
+    """
+    incremental-pdf 模式: 先由 Pandoc 生成 .tex, 再在持久化的 output/.latex 中直接驱动 LaTeX 引擎。
+    上一次构建的 .aux/.toc 等文件会被保留复用, 每一遍之后比较辅助文件,
+    一旦不再变化就停止, 因此正文的小改动通常只需要一遍编译。
+    """
+    latex = target["latex"]
+    latex_dir = latex["dir"]
+    latex_dir.mkdir(parents=True, exist_ok=True)
+    tex_path = latex_dir / "paper.tex"
+
+    started = time.perf_counter()
+    parser = OutputParser(default_file=str(tex_path))
+    result = _run_to_temp(target["command"], tex_path, status, parser)
+    result["output_path"] = target["output_path"]
+    if not result["ok"]:
+        return result
+    _profile_add("render pdf: write .tex", time.perf_counter() - started)
+
+    # 引擎在项目根目录运行, 使 ./figures/... 等相对路径照常解析 (根目录本身已由默认的 "." 覆盖);
+    # 只递归搜索 resources, 递归搜索整个项目会遍历 output、.git 等无关目录
+    env = dict(os.environ)
+    env["TEXINPUTS"] = os.pathsep.join([f"{latex['resources']}//", env.get("TEXINPUTS", "")])
+    command = [
+        latex["engine"], "-interaction=nonstopmode", "-halt-on-error", "-file-line-error",
+        f"-output-directory={latex_dir}", str(tex_path),
+    ]
+    passes = 0
+    # 生成 .tex 时 Pandoc 的诊断保留在前面, 之后的都来自 LaTeX 引擎
+    latex_start = len(parser.diagnostics)
+    try:
+        while passes < MAX_LATEX_PASSES:
+            before = _aux_state(latex_dir, tex_path.stem)
+            # 每一遍只保留本遍的诊断, 前几遍里 "引用未定义" 之类的警告在后续遍中会自然消失
+            del parser.diagnostics[latex_start:]
+            started = time.perf_counter()
+            proc = _run_process(command, cwd=latex["root"], env=env, on_line=_stream_handler(parser, status, f"{latex['engine']} "))
+            passes += 1
+            _profile_add(f"render pdf: {latex['engine']} pass {passes}", time.perf_counter() - started)
+            if proc is None:
+                _remove_aux(latex_dir, tex_path.stem)
+                result.update(ok=False, error="Build cancelled.", cancelled=True)
+                return result
+            result["output"] = proc.stdout
+            if proc.returncode != 0 or any(d.fatal for d in parser.diagnostics[latex_start:]):
+                _remove_aux(latex_dir, tex_path.stem)
+                result.update(ok=False, error=f"{latex['engine']} failed on pass {passes} (Exit Code {proc.returncode})")
+                return result
+            if _aux_state(latex_dir, tex_path.stem) == before:
+                break
+        else:
+            parser.diagnostics.append(Diagnostic(
+                "warning", f"Auxiliary files still changed after {MAX_LATEX_PASSES} {latex['engine']} passes; "
+                "cross-references or the table of contents may be out of date."
+            ))
+    except FileNotFoundError:
+        result.update(ok=False, error=f"'{latex['engine']}' command not found. Please run 'paw check'.")
+        return result
+
+    result["latex_passes"] = passes
+    if _profile:
+        log_path = latex_dir / "paper.log"
+        log_text = log_path.read_text(encoding="utf-8", errors="replace") if log_path.exists() else ""
+        _profile.add("render pdf: engine log", 0.0, passes=passes, **parse_engine_log(log_text))
+    os.replace(latex_dir / "paper.pdf", target["output_path"])
+    return result
+
+
+def run_pandoc(target: dict, status=None) -> dict:
+    """在工作线程中从 AST 渲染一个编译目标, 不直接打印输出; status 用于刷新进度显示"""
+    if "latex" in target:
+        result = run_latex(target, status)
+    else:
+        started = time.perf_counter()
+        result = _run_to_temp(_verbose(target["command"]), target["output_path"], status)
+        details = parse_engine_log(result["output"]) if target["format"] == "pdf" else {}
+        _profile_add(f"render {target['format']}", time.perf_counter() - started, **details)
+    result["format"] = target["format"]
+    return result
+
+
+def _print_diagnostics(diagnostics: list, label: str):
+    """按 (类型, 位置, 信息) 打印结构化诊断"""
+    if not diagnostics:
+        return
+    console.print(f"[yellow]Diagnostics ({label}):[/yellow]")
+    for diagnostic in diagnostics:
+        style = "bold red" if diagnostic.fatal else "yellow"
+        location = f" [dim]{diagnostic.location()}[/dim]" if diagnostic.location() else ""
+        console.print(f"  [{style}]{diagnostic.kind}[/{style}]{location} {escape(diagnostic.message)}")
+
+
+def _collapse_placeholders(diagnostics: list) -> list:
+    """预览只包含部分章节, 指向其他章节的交叉引用会渲染为占位符; 把这些诊断合并为一条提示"""
+    kept = [d for d in diagnostics if d.kind != "undefined-reference"]
+    if len(kept) != len(diagnostics):
+        console.print(f"   [dim]{len(diagnostics) - len(kept)} reference(s) to chapters outside the preview are shown as placeholders.[/dim]")
+    return kept
+
+
+def _print_failure(result: dict, label: str):
+    console.print(f"[bold red]{label} failed:[/bold red] {result['error']}")
+    # 没有识别出具体错误时, 退回到展示原始输出的末尾
+    if result["output"] and not any(d.fatal for d in result["diagnostics"]):
+        console.print(result["output"], markup=False)
+
+
+def _report_result(result: dict):
+    """按目标分组打印一个编译结果及其诊断"""
+    label = result["format"].upper()
+    if result["cancelled"]:
+        console.print(f"[dim]{label} cancelled.[/dim]")
+        return
+    _print_diagnostics(result["diagnostics"], label)
+    if result["ok"]:
+        passes = f" [dim]({result['latex_passes']} LaTeX pass(es))[/dim]" if result.get("latex_passes") else ""
+        console.print(f"✅ [bold green]Successfully created {result['output_path']}[/bold green]{passes}")
+    else:
+        _print_failure(result, label)
+
+
+def build_targets(formats: list, ctx: ProjectContext, force: bool = False, jobs: int | None = None, profile: BuildProfile | None = None, only: list | None = None) -> bool:
+    """
+    编译多个输出格式, 返回是否全部成功。
+    先运行一次共享的前端阶段, 再并行渲染各目标。各目标互不共享状态,
+    真正的工作发生在 Pandoc 子进程中, 因此用线程驱动即可并发。
+    only 不为空时只编译选中的章节, 输出到 output/preview-paper.*。
+    """
+    global _profile
+    _profile = profile
+    try:
+        return _build_targets(formats, ctx, force, jobs, only)
+    finally:
+        _profile = None
+
+
+def _build_targets(formats: list, ctx: ProjectContext, force: bool, jobs: int | None, only: list | None = None) -> bool:
+    output_dir = ctx.output
+    output_dir.mkdir(exist_ok=True)
+
+    chapters = ctx.chapters
+    if not chapters:
+        console.print("[bold red]Error:[/bold red] No chapter files found.")
         raise typer.Exit(1)
+    if only:
+        selected = select_chapters(chapters, only, ctx)
+        if not selected:
+            console.print(f"[bold red]Error:[/bold red] No chapters match --only {' '.join(only)}.")
+            raise typer.Exit(1)
+        names = ", ".join(Path(c).name for c in selected)
+        console.print(f"🔍 Previewing {len(selected)} of {len(chapters)} chapter(s): [cyan]{names}[/cyan]")
+        chapters = selected
+
+    # 如果 YAML 解析失败, 使用默认设置
+    data = ctx.metadata_or_default()
+
+    with utils.project_lock(output_dir / ".paw-build.lock"):
+        started = time.perf_counter()
+        manifest = BuildManifest(output_dir)
+        fronts = {}
+        targets = []
+        for output_format in formats:
+            console.print(f" brewing [bold blue]{output_format.upper()}[/bold blue]...")
+            family = writer_family(output_format)
+            if family not in fronts:
+                fronts[family] = prepare_front(ctx, chapters, data, manifest, family, preview=bool(only))
+            target = prepare_target(output_format, ctx, fronts[family], data, manifest, force)
+            if target:
+                targets.append(target)
+        _profile_add("fingerprint inputs", time.perf_counter() - started, chapters=len(chapters))
+
+        all_ok = True
+        # 本次真正重新编译了哪些输出, 供 build --all 区分 "built" 与 "up to date"
+        built = manifest.data["last-build"] = []
+        if targets:
+            needed = {target["front"]["family"]: target["front"] for target in targets}
+            run_fronts(list(needed.values()), ctx, manifest, force)
+            profile_fronts = {target["figures"]: target["front"] for target in targets if target["figures"]}
+            if profile_fronts:
+                run_figures(profile_fronts, ctx, data, manifest)
+            workers = max(1, min(jobs or len(targets), len(targets)))
+            columns = (SpinnerColumn(), TextColumn("{task.description}"), TimeElapsedColumn())
+            with Progress(*columns, console=console, transient=True) as progress, ThreadPoolExecutor(max_workers=workers) as pool, _cancel_on_interrupt():
+                futures = {}
+                for target in targets:
+                    label = target["format"].upper()
+                    task_id = progress.add_task(f"{label}: rendering")
+                    status = lambda text, task_id=task_id, label=label: progress.update(task_id, description=f"{label}: {text}")
+                    futures[pool.submit(run_pandoc, target, status)] = (target, task_id)
+                # 哪个目标先完成就先汇报哪个
+                for future in as_completed(futures):
+                    target, task_id = futures[future]
+                    result = future.result()
+                    progress.remove_task(task_id)
+                    if target["preview"]:
+                        result["diagnostics"] = _collapse_placeholders(result["diagnostics"])
+                    _report_result(result)
+                    if result["ok"]:
+                        manifest.record(result["output_path"].name, target["fingerprint"])
+                        built.append(result["output_path"].name)
+                    else:
+                        all_ok = False
+        manifest.save()
+    return all_ok
+
+
+def _watch_targets(ctx: ProjectContext) -> dict:
+    """
+    watch 模式需要关注的目录: 手稿、图片、资源, input-files 中位于 manuscript/ 之外的章节,
+    以及 metadata.yaml 引用的全局 CSL/模板
+    """
+    targets = {ctx.manuscript: None, ctx.resources: None}
+    figures_dir = ctx.figures
+    if figures_dir.is_dir():
+        targets[figures_dir] = None
+        for sub_dir in figures_dir.rglob("*"):
+            if sub_dir.is_dir():
+                targets[sub_dir] = None
+
+    data = ctx.metadata_or_default()
+    names = _as_list(data.get("bibliography")) + _as_list(data.get("csl")) + _as_list(data.get("reference-doc"))
+    files = [ctx.resolve_resource(name) for name in names] + [Path(os.path.abspath(chapter)) for chapter in ctx.chapters]
+    for resolved in files:
+        if resolved and resolved.parent not in targets:
+            targets.setdefault(resolved.parent, set()).add(resolved.name)
+        elif resolved and targets[resolved.parent] is not None:
+            targets[resolved.parent].add(resolved.name)
+    return {directory: names for directory, names in targets.items() if directory.is_dir()}
+
+
+def _watch_build(formats: list, ctx: ProjectContext, jobs: int | None, only: list | None = None):
+    """watch 模式下在后台线程中运行的一次构建"""
+    started = time.monotonic()
+    try:
+        ok = build_targets(formats, ctx, False, jobs, only=only)
+    except typer.Exit:
+        ok = False
+    if _cancel_event.is_set():
+        console.print("[dim]Build cancelled, restarting with the latest changes...[/dim]")
+    elif ok:
+        console.print(f"✨ [green]Build finished in {time.monotonic() - started:.1f}s.[/green] Watching for changes...")
+    else:
+        console.print("[bold red]Build failed.[/bold red] Watching for changes...")
+
+
+def watch(formats: list, ctx: ProjectContext, jobs: int | None = None, debounce: float = 0.3, only: list | None = None):
+    """
+    监视项目文件, 在改动后自动重新编译。
+    连续保存会在 debounce 秒的静默期内合并为一次构建; 新的改动到来时会中止仍在进行的构建。
+    只有输入发生变化的目标会被重新编译 (其余目标命中构建缓存)。
+    """
+    targets = _watch_targets(ctx)
+    watcher = create_watcher(targets)
+    console.print(f"👀 Watching {len(targets)} location(s) for changes [dim](Ctrl+C to stop)[/dim]...")
+
+    def start_build():
+        _cancel_event.clear()
+        thread = threading.Thread(target=_watch_build, args=(formats, ctx, jobs, only), daemon=True)
+        thread.start()
+        return thread
+
+    build_thread = start_build()
+    try:
+        while True:
+            changed = watcher.poll(None)
+            if build_thread.is_alive():
+                cancel_builds()
+            # 合并一连串的保存事件, 直到文件静默 debounce 秒
+            while True:
+                more = watcher.poll(debounce)
+                if not more:
+                    break
+                changed |= more
+            build_thread.join()
+
+            names = sorted({Path(path).name for path in changed})
+            console.print(f"\n🔄 Changed: [cyan]{', '.join(names[:5])}[/cyan]{' ...' if len(names) > 5 else ''}")
+            if ctx.metadata_path in {Path(path) for path in changed}:
+                # 参考文献或模板可能变了, 重新计算监视范围
+                new_targets = _watch_targets(ctx)
+                if new_targets != targets:
+                    watcher.close()
+                    targets = new_targets
+                    watcher = create_watcher(targets)
+            build_thread = start_build()
+    except KeyboardInterrupt:
+        cancel_builds()
+        build_thread.join()
+        console.print("\n🐾 Stopped watching. Good work today!")
+    finally:
+        watcher.close()
+
+
+def _build_one_project(project: Path, build_args: list) -> dict:
+    """在子进程中编译一个项目, 输出写入该项目的 output/paw-build.log"""
+    log_path = project / "output" / "paw-build.log"
+    log_path.parent.mkdir(exist_ok=True)
+    # 显式指定要编译的项目; 从调用方继承的 PAW_PROJECT 会让每个子进程都去编译同一个项目
+    env = dict(os.environ, COLUMNS="120")
+    env[config.PROJECT_ENV] = str(project)
+    started = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.run(utils.paw_command() + ["build"] + build_args, cwd=project, env=env, stdout=log, stderr=subprocess.STDOUT)
+    if proc.returncode != 0:
+        status = "failed"
+    elif BuildManifest(project / "output").data.get("last-build"):
+        status = "built"
+    else:
+        status = "up to date"
+    return {"project": project, "status": status, "seconds": time.perf_counter() - started, "log": log_path}
+
+
+def build_all(base_dir: Path, build_args: list, jobs: int | None = None) -> bool:
+    """
+    批量编译 base_dir 下的所有 PAW 项目, 返回是否全部成功。
+    每个项目在独立的 paw 子进程中编译, 因此各自的构建缓存与项目锁照常生效,
+    未变化的项目会很快以 "up to date" 结束。
+    """
+    projects = utils.find_projects(base_dir)
+    if not projects:
+        console.print(f"[bold yellow]Warning:[/bold yellow] No PAW projects found under '{base_dir}'.")
+        return True
+
+    workers = max(1, min(jobs or (os.cpu_count() or 2) // 2 or 1, len(projects)))
+    console.print(f"🐾 Building [bold]{len(projects)}[/bold] project(s) under [cyan]{base_dir}[/cyan] with {workers} worker(s)...")
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_build_one_project, project, build_args) for project in projects]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            icon = {"built": "✅", "up to date": "⚡", "failed": "❌"}[result["status"]]
+            console.print(f" {icon} {result['project'].relative_to(base_dir)} [dim]({result['status']}, {result['seconds']:.1f}s)[/dim]")
+
+    table = Table(title="PAW Batch Build Summary")
+    table.add_column("Project", style="cyan")
+    table.add_column("Status", justify="center")
+    table.add_column("Time", justify="right")
+    table.add_column("Log", style="dim")
+    styles = {"built": "[bold green]✓ Built[/bold green]", "up to date": "[cyan]⚡ Up to date[/cyan]", "failed": "[bold red]✗ Failed[/bold red]"}
+    for result in sorted(results, key=lambda r: str(r["project"])):
+        table.add_row(str(result["project"].relative_to(base_dir)), styles[result["status"]], f"{result['seconds']:.1f}s", str(result["log"]))
+    console.print(table)
+
+    failed = [r for r in results if r["status"] == "failed"]
+    if failed:
+        console.print(f"[bold red]{len(failed)} of {len(results)} project(s) failed.[/bold red] See the logs above for details.")
+    return not failed
+
 
 def build(
     pdf: Optional[bool] = typer.Option(None, "--pdf", help="仅编译 PDF。"),
-    docx: Optional[bool] = typer.Option(None, "--docx", help="仅编译 DOCX。")
+    docx: Optional[bool] = typer.Option(None, "--docx", help="仅编译 DOCX。"),
+    to: Optional[list[str]] = typer.Option(None, "--to", "-t", help="额外编译的 Pandoc 输出格式 (如 html, odt, latex), 可重复使用。"),
+    force: bool = typer.Option(False, "--force", "-f", help="忽略构建缓存, 强制重新编译。"),
+    jobs: Optional[int] = typer.Option(None, "--jobs", "-j", min=1, help="同时编译的目标数 (默认: 全部并行)。"),
+    watch_mode: bool = typer.Option(False, "--watch", "-w", help="监视文件改动并自动重新编译。"),
+    profile: bool = typer.Option(False, "--profile", help="统计各编译阶段耗时, 输出表格与 JSON 报告 (output/profile/)。"),
+    only: Optional[list[str]] = typer.Option(None, "--only", help="预览: 只编译选中的章节 (编号如 03、通配符或路径), 输出到 output/preview-paper.*。可重复使用。"),
+    all_dir: Optional[Path] = typer.Option(None, "--all", help="批量编译该目录下的所有 PAW 项目 (此时 --jobs 为同时编译的项目数)。", exists=True, file_okay=False, dir_okay=True, resolve_path=True),
 ):
     """
     编译项目, 生成最终文档。
-    默认行为 (不带任何标志): 同时编译 PDF 和 DOCX。
+    默认行为 (不带任何标志): 同时并行编译 PDF 和 DOCX。
+    输入未变化的目标会命中构建缓存而被跳过, 使用 --force 强制重新编译。
     """
-    project_paths = utils.get_project_paths()
+    # 在 paw daemon 中, 上一条命令 (例如被中止的 watch) 可能留下了取消标记
+    _cancel_event.clear()
 
-    # 显式模式：如果用户指定了 --pdf 或 --docx
-    if pdf is True or docx is True:
-        if pdf:
-            run_pandoc("pdf", project_paths)
-        if docx:
-            run_pandoc("docx", project_paths)
+    if all_dir:
+        if watch_mode:
+            raise typer.BadParameter("cannot be combined with --all; watch one project at a time.", param_hint="'--watch'")
+        # 把格式相关的参数原样传给每个项目的 paw build; --profile 让每个项目各自写出分析报告
+        build_args = (["--pdf"] if pdf else []) + (["--docx"] if docx else []) + (["--force"] if force else [])
+        build_args += ["--profile"] if profile else []
+        for fmt in to or []:
+            build_args.extend(["--to", fmt])
+        for selector in only or []:
+            build_args.extend(["--only", selector])
+        if not build_all(all_dir, build_args, jobs):
+            raise typer.Exit(1)
+        return
+
+    ctx = get_context()
+
+    # 显式模式：如果用户指定了 --pdf, --docx 或 --to
+    if pdf is True or docx is True or to:
+        formats = [fmt for fmt, wanted in (("pdf", pdf), ("docx", docx)) if wanted]
+        formats.extend(fmt for fmt in (to or []) if fmt not in formats)
     # 默认模式：如果用户只输入 `paw build`
     else:
-        run_pandoc("pdf", project_paths)
-        run_pandoc("docx", project_paths)
+        formats = ["pdf", "docx"]
+
+    if watch_mode:
+        watch(formats, ctx, jobs, only=only)
+        return
+
+    build_profile = BuildProfile() if profile else None
+    try:
+        ok = build_targets(formats, ctx, force, jobs, build_profile, only)
+    finally:
+        if build_profile:
+            console.print(build_profile.render_table())
+            report_path = build_profile.write_json(ctx.output, project=ctx.root.name, formats=formats, force=force, only=only)
+            console.print(f"📊 Profile written to [cyan]{report_path}[/cyan]")
+    if not ok:
+        raise typer.Exit(1)
@@ -1,72 +1,139 @@
 import typer
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Optional
 from rich.console import Console
 from rich.prompt import Prompt
 import pyperclip
-from pybtex.database import parse_file as parse_bib_file, BibliographyData, Entry
-from .. import utils
+from contextlib import closing, redirect_stdout
+from rich.markup import escape
+from .. import picker
+from ..bibindex import BibIndex, BibRecord
+from ..context import get_context
 
 console = Console()
 
-def format_entry(entry: Entry) -> str:
+_DOI_PREFIX = re.compile(r"^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)", re.IGNORECASE)
+
+def format_entry(entry: BibRecord) -> str:
     """格式化文献条目以便在列表中显示"""
-    authors = "Unknown Author"
-    if 'author' in entry.persons:
-        author_list = [str(p) for p in entry.persons['author']]
-        if len(author_list) > 2:
-            authors = f"{', '.join(author_list[:-1])}, and {author_list[-1]}"
-        else:
-            authors = ' and '.join(author_list)
-
-    year = entry.fields.get('year', 'N/A')
-    title = entry.fields.get('title', 'No Title')
+    title = entry.title
     if len(title) > 60:
         title = title[:57] + "..."
-        
-    return f"[yellow]{entry.key}[/yellow] - {authors} ({year}). {title}"
 
-def cite(keywords: list[str] = typer.Argument(None, help="用于搜索本地 .bib 文件的关键词 (作者, 年份, 标题等)。")):
+    return f"[yellow]{escape(entry.key)}[/yellow] - {escape(entry.authors)} ({escape(entry.year)}). {escape(title)}"
+
+def plain_entry(entry: BibRecord) -> str:
+    """不带 Rich 标记的完整条目 (供 --batch 的 JSON 输出使用)"""
+    return f"{entry.authors} ({entry.year}). {entry.title}"
+
+def cite(
+    keywords: list[str] = typer.Argument(None, help="用于搜索本地 .bib 文件的关键词 (作者, 年份, 标题等)。"),
+    batch: bool = typer.Option(False, "--batch", help="非交互模式: 逐行读取查询 (关键词、DOI 或标题), 每个查询输出一行 JSON。"),
+    input_file: Optional[Path] = typer.Option(None, "--input", "-i", help="--batch 的查询文件 (默认读取标准输入)。", exists=True, file_okay=True, dir_okay=False, readable=True),
+):
     """
     交互式搜索项目本地的 .bib 文件并复制引用键。
+    在终端中运行时打开全屏选择器 (边输入边检索, Tab 多选, 复制为 [@a; @b])。
     """
-    project_paths = utils.get_project_paths()
+    if batch:
+        # 标准输出只写 JSON: 提示与错误 (包括查找项目、读取元数据时其他模块打印的) 都改写到标准错误
+        with redirect_stdout(sys.stderr):
+            index, existing = _open_index(Console(stderr=True), batch=True)
+        # 批量解析的各行互不相关, 不需要缓存上一次的结果来缩小范围
+        with closing(index.session(existing, cache_size=0)) as session:
+            if input_file:
+                with open(input_file, "r", encoding="utf-8") as f:
+                    resolve_batch(session, f, sys.stdout)
+            else:
+                resolve_batch(session, sys.stdin, sys.stdout)
+        return
+
+    index, existing = _open_index(console)
+    if picker.is_interactive():
+        # 全屏选择器: 边输入边检索, Tab 多选
+        with closing(index.session(existing)) as session:
+            selected_keys = picker.CitationPicker(session, format_entry, " ".join(keywords or []), console).run()
+        if not selected_keys:
+            console.print("Aborted.")
+            raise typer.Exit()
+    else:
+        selected_keys = [_choose_from_list(index, existing, keywords or [])]
+
+    citation_to_copy = "[" + "; ".join(f"@{key}" for key in selected_keys) + "]"
+    index.record_use(selected_keys)
+    try:
+        pyperclip.copy(citation_to_copy)
+        console.print(f"\nCopied to clipboard: [bold cyan]{escape(citation_to_copy)}[/bold cyan]")
+    except pyperclip.PyperclipException:
+        console.print("[bold red]Clipboard error:[/bold red] Could not copy to clipboard.")
+        console.print(f"You can manually copy: [bold cyan]{escape(citation_to_copy)}[/bold cyan]")
 
+
+def _open_index(log: Console, batch: bool = False) -> tuple:
+    """
+    打开 (并按需刷新) 项目的文献索引, 返回 (索引, 存在的 .bib 路径)。
+    无法检索时报错退出; batch 模式下没有配置参考文献也以非零状态退出, 以便脚本察觉。
+    """
+    ctx = get_context()
     try:
-        data = utils.read_yaml_file(project_paths["metadata"])
-        bib_paths_config = data.get("bibliography", [])
-        if isinstance(bib_paths_config, str):
-            bib_paths_config = [bib_paths_config]
+        bib_paths = ctx.bibliography_paths
     except Exception as e:
-        console.print(f"[bold red]Error reading bibliography from metadata.yaml: {e}[/bold red]")
+        log.print(f"[bold red]Error reading bibliography from metadata.yaml: {e}[/bold red]")
         raise typer.Exit(1)
 
-    if not bib_paths_config:
-        console.print("[bold yellow]Warning:[/bold yellow] No 'bibliography' key found in metadata.yaml. Cannot search for citations.")
-        raise typer.Exit()
+    if not bib_paths:
+        log.print("[bold yellow]Warning:[/bold yellow] No 'bibliography' key found in metadata.yaml. Cannot search for citations.")
+        raise typer.Exit(1 if batch else 0)
 
-    all_entries = {}
-    for bib_path_str in bib_paths_config:
-        bib_path = project_paths["root"] / bib_path_str
+    existing = []
+    for bib_path in bib_paths:
         if not bib_path.exists():
-            console.print(f"[bold yellow]Warning:[/bold yellow] Bibliography file not found: {bib_path}")
+            log.print(f"[bold yellow]Warning:[/bold yellow] Bibliography file not found: {bib_path}")
             continue
-        try:
-            bib_data = parse_bib_file(str(bib_path), 'bibtex')
-            all_entries.update(bib_data.entries)
-        except Exception as e:
-            console.print(f"[bold red]Error parsing bib file {bib_path}: {e}[/bold red]")
-
-    if not all_entries:
-        console.print("[bold red]Error:[/bold red] No citation entries found in any .bib file.")
+        existing.append(bib_path)
+
+    # 只有改动过的 .bib 文件会被重新解析, 其余条目直接从索引读取
+    index = BibIndex(ctx.output)
+    for bib_path, e in index.refresh(existing):
+        log.print(f"[bold red]Error parsing bib file {bib_path}: {e}[/bold red]")
+
+    if not index.count(existing):
+        log.print("[bold red]Error:[/bold red] No citation entries found in any .bib file.")
         raise typer.Exit(1)
-    
-    if not keywords:
-        found_entries = list(all_entries.values())
-    else:
-        search_terms = [k.lower() for k in keywords]
-        found_entries = [
-            entry for entry in all_entries.values()
-            if all(term in str(entry.to_string('bibtex')).lower() for term in search_terms)
-        ]
+    return index, existing
+
+
+def _query_terms(query: str) -> list:
+    """一行查询拆分为检索词; DOI 链接只保留 DOI 本身 (https://doi.org/10.x/y -> 10.x/y)"""
+    query = _DOI_PREFIX.sub("", query.strip())
+    return query.split()
+
+
+def resolve_batch(session, lines, out):
+    """
+    在同一个检索会话中逐行解析查询, 每个查询立即输出一行 JSON:
+    {"query", "key", "score", "entry"}; 没有匹配时 key 为 null。
+    """
+    for line in lines:
+        query = line.strip()
+        if not query:
+            continue
+        _total, hits = session.page(_query_terms(query), 0, 1)
+        result = {"query": query, "key": None, "score": 0.0, "entry": None}
+        if hits:
+            entry, score = hits[0]
+            result.update(key=entry.key, score=round(score, 4), entry=plain_entry(entry))
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+
+
+def _choose_from_list(index: BibIndex, bib_paths: list, keywords: list) -> str:
+    """不在终端中运行时 (例如输出被重定向): 列出全部匹配项, 再输入编号选择"""
+    # 按相关度排序 (支持前缀与拼写容错), 最近引用过的文献排在前面
+    found_entries = [entry for entry, _score in index.search(bib_paths, keywords)]
 
     if not found_entries:
         console.print("No matching citations found.")
@@ -86,16 +153,7 @@ def cite(keywords: list[str] = typer.Argument(None, help="用于搜索本地 .bi
         choice_idx = int(choice) - 1
         if not 0 <= choice_idx < len(found_entries):
             raise ValueError
-        
-        selected_key = found_entries[choice_idx].key
-        citation_to_copy = f"[@{selected_key}]"
-        
-        pyperclip.copy(citation_to_copy)
-        console.print(f"\nCopied to clipboard: [bold cyan]{citation_to_copy}[/bold cyan]")
-
+        return found_entries[choice_idx].key
     except (ValueError, IndexError):
         console.print("[bold red]Invalid selection.[/bold red]")
         raise typer.Exit(1)
-    except pyperclip.PyperclipException:
-        console.print("[bold red]Clipboard error:[/bold red] Could not copy to clipboard.")
-        console.print(f"You can manually copy: [bold cyan]{citation_to_copy}[/bold cyan]")
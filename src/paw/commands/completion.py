@@ -0,0 +1,108 @@
+import typer
+import click
+from rich.console import Console
+from .. import completion, config
+
+console = Console()
+
+app = typer.Typer(
+    name="completion",
+    help="安装 Shell 补全 (基于预先生成的索引, 按 TAB 时不导入 Typer/Rich)。",
+    no_args_is_help=True
+)
+
+# 参数值的补全来源: (注册表中的 target, 子命令名) -> 来源;
+# csl / template 为全局资源名, chapter 为项目章节, citation 为项目 .bib 中的引用键
+ARGUMENT_SOURCES = {
+    ("csl:app", "use"): "csl",
+    ("csl:app", "remove"): "csl",
+    ("template:app", "use"): "template",
+    ("template:app", "remove"): "template",
+    ("cite:cite", None): "citation",
+}
+OPTION_SOURCES = {
+    ("build:build", "--only"): "chapter",
+}
+
+SCRIPTS = {
+    "bash": """\
+_paw_complete() {
+    local IFS=$'\\n'
+    COMPREPLY=($(paw __complete "$COMP_CWORD" "${COMP_WORDS[@]}" 2>/dev/null))
+}
+complete -o default -F _paw_complete paw
+""",
+    "zsh": """\
+#compdef paw
+_paw_complete() {
+    local -a items
+    items=("${(@f)$(paw __complete $((CURRENT - 1)) "${words[@]}" 2>/dev/null)}")
+    compadd -a items
+}
+compdef _paw_complete paw
+""",
+    "fish": """\
+function __paw_complete
+    set -l words (commandline -opc) (commandline -ct)
+    paw __complete (math (count $words) - 1) $words 2>/dev/null
+end
+complete -c paw -f -a '(__paw_complete)'
+""",
+}
+
+
+def _node(command: click.Command, target: str, sub: str | None = None) -> dict:
+    """把一个 Click 命令转换为补全索引中的节点"""
+    node = {}
+    if command.hidden:
+        node["hidden"] = True
+    options = {}
+    for param in command.params:
+        if isinstance(param, click.Option):
+            # 需要取值但没有补全来源的选项记为 "value", 以免把它的值当成子命令
+            source = None if param.is_flag else OPTION_SOURCES.get((target, param.opts[0]), "value")
+            for name in param.opts + param.secondary_opts:
+                options[name] = source
+        elif (target, sub) in ARGUMENT_SOURCES:
+            node["arguments"] = ARGUMENT_SOURCES[(target, sub)]
+    node["options"] = options
+    if isinstance(command, click.Group):
+        node["commands"] = {
+            name: _node(child, target, name) for name, child in command.commands.items()
+        }
+    return node
+
+
+def command_tree() -> dict:
+    """导入全部命令, 生成 `paw __complete` 使用的命令树"""
+    from ..main import COMMANDS, PawGroup
+
+    group = PawGroup()
+    group.load_all()
+    commands = {}
+    for name, spec in COMMANDS.items():
+        node = _node(group._loaded[name], spec.target)
+        if spec.hidden:
+            node["hidden"] = True
+        commands[name] = node
+    return {"commands": commands, "options": {}}
+
+
+@app.command("refresh", help="重新生成补全索引 (命令树、全局 CSL 与模板名)。")
+def refresh(quiet: bool = typer.Option(False, "--quiet", "-q", help="不输出任何信息。")):
+    index = completion.global_index(refresh_commands=False)
+    index["commands"] = command_tree()
+    index["package"] = completion.package_stamp()
+    completion.save_index(config.COMPLETION_INDEX, index)
+    if not quiet:
+        console.print(f"[green]✓ Completion index written to '{config.COMPLETION_INDEX}'.[/green]")
+
+
+@app.command("show", help="输出指定 Shell 的补全脚本, 例如: eval \"$(paw completion show bash)\"")
+def show(shell: str = typer.Argument(..., help="bash, zsh 或 fish。")):
+    script = SCRIPTS.get(shell.lower())
+    if script is None:
+        console.print(f"[bold red]Error:[/bold red] Unsupported shell '{shell}'. Choose from: {', '.join(SCRIPTS)}.")
+        raise typer.Exit(1)
+    # 直接写到标准输出, 不经过 Rich 的标记解析与折行
+    typer.echo(script, nl=False)
@@ -0,0 +1,82 @@
+import typer
+import os
+import subprocess
+import time
+from rich.console import Console
+from .. import config, daemon, utils
+
+console = Console()
+
+app = typer.Typer(
+    name="daemon",
+    help="管理常驻的 PAW 后台进程, 让 build / cite / woof 跳过启动与解析开销。",
+    no_args_is_help=True
+)
+
+
+def _require_support():
+    if not daemon.is_supported():
+        console.print("[bold red]Error:[/bold red] paw daemon requires Unix sockets (macOS / Linux, Python 3.9+).")
+        raise typer.Exit(1)
+
+
+@app.command("start", help="在后台启动 paw daemon。")
+def start(idle_timeout: int = typer.Option(30, "--idle-timeout", min=1, help="空闲多少分钟后自动退出。")):
+    _require_support()
+    status = daemon.request({"control": "ping"})
+    if status:
+        console.print(f"🐾 paw daemon is already running [dim](pid {status['pid']})[/dim].")
+        return
+
+    utils.ensure_paw_dirs()
+    with open(config.DAEMON_LOG, "a", encoding="utf-8") as log:
+        subprocess.Popen(
+            utils.paw_command() + ["daemon", "run", "--idle-timeout", str(idle_timeout)],
+            stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+            start_new_session=True, env=dict(os.environ, PAW_NO_DAEMON="1"),
+        )
+    # 等待 daemon 完成导入并开始监听
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        status = daemon.request({"control": "ping"})
+        if status:
+            console.print(f"✅ [bold green]paw daemon started[/bold green] [dim](pid {status['pid']}, exits after {idle_timeout} idle minutes)[/dim].")
+            return
+        time.sleep(0.1)
+    console.print(f"[bold red]Error:[/bold red] paw daemon did not start. See '{config.DAEMON_LOG}'.")
+    raise typer.Exit(1)
+
+
+@app.command("run", help="在前台运行 paw daemon (用于调试)。")
+def run(idle_timeout: int = typer.Option(30, "--idle-timeout", min=1, help="空闲多少分钟后自动退出。")):
+    _require_support()
+    console.print(f"🐾 paw daemon listening on [cyan]{config.DAEMON_SOCKET}[/cyan] [dim](pid {os.getpid()})[/dim]")
+    try:
+        daemon.serve(idle_timeout * 60)
+    except RuntimeError as e:
+        console.print(f"[bold red]Error:[/bold red] {e}")
+        raise typer.Exit(1)
+    except KeyboardInterrupt:
+        pass
+    console.print("🐾 paw daemon stopped.")
+
+
+@app.command("stop", help="停止 paw daemon。")
+def stop():
+    if not daemon.request({"control": "stop"}):
+        console.print("paw daemon is not running.")
+        return
+    console.print("🐾 paw daemon stopped.")
+
+
+@app.command("status", help="查看 paw daemon 是否在运行。")
+def status():
+    info = daemon.request({"control": "ping"})
+    if not info:
+        console.print("paw daemon is [yellow]not running[/yellow]. Start it with [cyan]paw daemon start[/cyan].")
+        return
+    minutes = int(info["uptime"] // 60)
+    console.print(f"🐾 paw daemon is [bold green]running[/bold green] [dim](pid {info['pid']})[/dim]")
+    console.print(f"- [cyan]Uptime[/cyan]: {minutes} min")
+    console.print(f"- [cyan]Requests served[/cyan]: {info['served']}")
+    console.print(f"- [cyan]Idle timeout[/cyan]: {int(info['idle_timeout'] // 60)} min")
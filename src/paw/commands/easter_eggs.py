@@ -2,7 +2,8 @@ import typer
 import random
 from rich.console import Console
 from rich.align import Align
-from .. import utils
+from ..bibindex import BibIndex
+from ..context import get_context
 
 console = Console()
 
@@ -26,37 +27,27 @@ def woof():
     """快速汇报项目统计信息。"""
     console.print("🐾 [bold]Woof! Here's the report on your project:[/bold]")
     try:
-        project_paths = utils.get_project_paths()
-        
-        manuscript_files = list(project_paths["manuscript"].glob("*.md"))
-        figure_files = list(project_paths["figures"].glob("*"))
+        ctx = get_context()
+        figure_files = list(ctx.figures.glob("*"))
 
         # 统计 bib 文件中的条目数
         bib_entries_count = 0
         try:
-            with open(project_paths["frontmatter"], 'r', encoding='utf-8') as f:
-                docs = list(utils.yaml.load_all(f))
-            bib_paths_config = docs[0].get("bibliography", [])
-            if isinstance(bib_paths_config, str):
-                bib_paths_config = [bib_paths_config]
-            
-            from pybtex.database import parse_file as parse_bib_file
-            for bib_path_str in bib_paths_config:
-                bib_path = project_paths["root"] / bib_path_str
-                if bib_path.exists():
-                    bib_data = parse_bib_file(str(bib_path), 'bibtex')
-                    bib_entries_count += len(bib_data.entries)
+            bib_paths = [p for p in ctx.bibliography_paths if p.exists()]
+            index = BibIndex(ctx.output)
+            # 解析失败的文件不计入
+            index.refresh(bib_paths)
+            bib_entries_count = index.count(bib_paths)
         except Exception:
-            # 如果解析失败, 忽略
             pass
 
-        console.print(f"- [cyan]Chapters[/cyan]: {len(manuscript_files) - 1} (+1 frontmatter file)")
+        console.print(f"- [cyan]Chapters[/cyan]: {len(ctx.chapters)}")
         console.print(f"- [cyan]Figures[/cyan]: {len(figure_files)}")
         console.print(f"- [cyan]Citations[/cyan]: {bib_entries_count} entries found in .bib files")
         console.print("\nKeep up the great work!")
 
     except typer.Exit:
-        # 捕获 get_project_paths 找不到项目时的退出异常
+        # 捕获 get_context 找不到项目时的退出异常
         console.print("[yellow]You need to be inside a PAW project directory for me to report on it.[/yellow]")
         
 
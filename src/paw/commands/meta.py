@@ -0,0 +1,49 @@
+import typer
+from rich.console import Console
+from .. import utils
+from ..context import get_context
+
+app = typer.Typer(
+    name="meta",
+    help="批量修改 manuscript/metadata.yaml (保留注释, 一次性原子写回)。",
+    no_args_is_help=True
+)
+console = Console()
+
+
+def parse_assignment(assignment: str) -> tuple:
+    """
+    解析 key=value 或 key+=value (向列表追加)。
+    值按 YAML 解析: true/false、数字、[a, b] 等会得到对应的类型, 其余为字符串。
+    """
+    key, sep, raw = assignment.partition("=")
+    append = key.endswith("+")
+    key = key.rstrip("+").strip()
+    if not sep or not key:
+        console.print(f"[bold red]Error:[/bold red] Expected key=value or key+=value, got '{assignment}'.")
+        raise typer.Exit(1)
+    if not raw.strip():
+        return key, append, ""
+    try:
+        value = utils.safe_yaml().load(raw)
+    except Exception:
+        value = raw
+    return key, append, value
+
+
+@app.command("set", help="设置一个或多个键: paw meta set title=\"新标题\" toc=false bibliography+=resources/more.bib")
+def set_meta(assignments: list[str] = typer.Argument(..., help="key=value 设置键值, key+=value 向列表追加。")):
+    edits = [parse_assignment(a) for a in assignments]
+    ctx = get_context()
+    with ctx.edit_metadata() as meta:
+        for key, append, value in edits:
+            if append:
+                meta.append(key, value)
+            else:
+                meta.set(key, value)
+        changed = list(dict.fromkeys(meta.changes))
+
+    if not meta.written:
+        console.print("[dim]metadata.yaml is already up to date, nothing written.[/dim]")
+        return
+    console.print(f"[green]✓ Updated {', '.join(changed)} in '{ctx.metadata_path.name}'.[/green]")
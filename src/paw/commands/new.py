@@ -2,7 +2,7 @@ import typer
 from pathlib import Path
 from rich.console import Console
 from ..templates import file_templates
-from .. import utils
+from .. import config, utils
 
 console = Console()
 
@@ -25,6 +25,7 @@ def create_project(project_path: Path, title: str):
     # 最终的文件结构，使用 metadata.yaml 替代 00-frontmatter.md
     files_to_create = {
         "Makefile": file_templates.get_makefile_template(),
+        config.PROJECT_MARKER: file_templates.get_project_marker_template(),
         ".gitignore": file_templates.get_gitignore_template() or "...", # 如果模板为空，提供默认值
         "README.md": file_templates.get_readme_template(project_path.name) or "...", # 同上
         "manuscript/metadata.yaml": file_templates.get_metadata_template(title),
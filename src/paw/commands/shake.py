@@ -1,7 +1,7 @@
 import typer
 import shutil
 from rich.console import Console
-from .. import utils
+from ..context import get_context
 
 console = Console()
 
@@ -9,10 +9,9 @@ def shake():
     """
     清理项目输出目录 (`output/`)。
     """
-    project_paths = utils.get_project_paths()
-    output_dir = project_paths.get("output")
+    output_dir = get_context().output
 
-    if not output_dir or not output_dir.is_dir():
+    if not output_dir.is_dir():
         console.print("[bold red]Error:[/bold red] 'output' directory not found in this project.")
         raise typer.Exit(1)
 
@@ -0,0 +1,207 @@
+# Shell 补全的应答端。只依赖标准库: 每次按 TAB 都会启动一个进程, 不能付出导入 Typer/Rich 的开销。
+#
+# 补全数据来自预先生成的索引:
+# - ~/.paw/completion.json: 命令树 (由 `paw completion refresh` 生成) 与全局 CSL / 模板名;
+# - <项目>/output/.cache/completion.json: 章节与引用键。
+# 目录与 .bib 文件以 mtime (+ size) 为戳记, 只有变化的部分会被重新扫描。
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from . import config
+from .bibtex import iter_entries
+from .cache import atomic_write, stat_key
+from .discovery import find_project_root
+
+INDEX_VERSION = 1
+PROJECT_INDEX = Path("output") / ".cache" / "completion.json"
+PACKAGE_DIR = Path(__file__).resolve().parent
+
+
+def _stamp(path: Path) -> list | None:
+    """stat_key 的 JSON 形式 (列表), 以便与从索引中读出的戳记比较"""
+    key = stat_key(path)
+    return list(key) if key else None
+
+
+def package_stamp() -> list | None:
+    """PAW 自身的戳记; 升级或修改命令后命令树需要重新生成"""
+    main_file = PACKAGE_DIR / "main.py"
+    return _stamp(main_file if main_file.exists() else Path(sys.executable))
+
+
+def load_index(path: Path) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) and data.get("version") == INDEX_VERSION else {}
+
+
+def save_index(path: Path, data: dict):
+    """原子地写回索引; 写入失败 (例如目录只读) 时静默放弃, 下次再试"""
+    data["version"] = INDEX_VERSION
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(path) as f:
+            json.dump(data, f, ensure_ascii=False)
+    except OSError:
+        pass
+
+
+def _refresh_listing(index: dict, name: str, directory: Path, scan) -> bool:
+    """目录的 mtime 变化时重新扫描; 返回索引是否被更新"""
+    stamp = _stamp(directory)
+    entry = index.get(name)
+    if entry and entry.get("stamp") == stamp:
+        return False
+    index[name] = {"stamp": stamp, "items": scan(directory) if stamp else []}
+    return True
+
+
+def _resource_names(extension: str):
+    def scan(directory: Path) -> list:
+        return sorted(p.stem for p in directory.glob(f"*{extension}"))
+    return scan
+
+
+def _chapter_names(manuscript: Path) -> list:
+    """章节编号 (如 03) 与文件名 (如 03-methods), 供 build --only 使用"""
+    items = []
+    for path in sorted(manuscript.glob("[0-9]*.md")):
+        number = path.stem.split("-", 1)[0]
+        if number not in items:
+            items.append(number)
+        items.append(path.stem)
+    return items
+
+
+def _bib_files(root: Path) -> list:
+    """项目根目录与 resources/ 下的 .bib 文件 (与编译时查找参考文献的位置一致)"""
+    return sorted(root.glob("*.bib")) + sorted((root / "resources").glob("*.bib"))
+
+
+def _refresh_citations(index: dict, root: Path) -> bool:
+    """只重新扫描改动过的 .bib 文件; 已删除的文件从索引中移除"""
+    old = index.get("bib", {})
+    new = {}
+    changed = False
+    for path in _bib_files(root):
+        key = str(path.relative_to(root))
+        stamp = _stamp(path)
+        if key in old and old[key].get("stamp") == stamp:
+            new[key] = old[key]
+            continue
+        try:
+            text = path.read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            continue
+        keys = [k for _type, k, _start, _end in iter_entries(text) if k]
+        new[key] = {"stamp": stamp, "keys": keys}
+        changed = True
+    index["bib"] = new
+    return changed or set(old) != set(new)
+
+
+def global_index(refresh_commands: bool = True) -> dict:
+    """读取 (必要时增量更新) 全局索引"""
+    path = config.COMPLETION_INDEX
+    index = load_index(path)
+    changed = _refresh_listing(index, "csl", config.CSL_DIR, _resource_names(".csl"))
+    changed |= _refresh_listing(index, "template", config.TEMPLATES_DIR, _resource_names(".docx"))
+    if changed:
+        save_index(path, index)
+    if refresh_commands and index.get("package") != package_stamp():
+        # 第一次使用或 PAW 升级后: 由完整的 paw 进程重新生成命令树 (只在这一次按 TAB 时较慢)
+        _regenerate_commands()
+        index = load_index(path) or index
+    return index
+
+
+def _regenerate_commands():
+    if getattr(sys, "frozen", False) or "__compiled__" in globals():
+        command = [sys.executable]
+    else:
+        command = [sys.executable, "-m", "paw.main"]
+    env = dict(os.environ, PAW_NO_DAEMON="1")
+    try:
+        subprocess.run(command + ["completion", "refresh", "--quiet"], env=env, timeout=30,
+                       stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.SubprocessError):
+        pass
+
+
+def project_index(root: Path) -> dict:
+    """读取 (必要时增量更新) 项目索引"""
+    path = root / PROJECT_INDEX
+    index = load_index(path)
+    changed = _refresh_listing(index, "chapters", root / "manuscript", _chapter_names)
+    changed |= _refresh_citations(index, root)
+    if changed:
+        save_index(path, index)
+    return index
+
+
+def candidates(source: str, index: dict) -> list:
+    if source in ("csl", "template"):
+        return index.get(source, {}).get("items", [])
+    if source not in ("chapter", "citation"):
+        return []
+    root = find_project_root()
+    if root is None:
+        return []
+    project = project_index(root)
+    if source == "chapter":
+        return project.get("chapters", {}).get("items", [])
+    if source == "citation":
+        return [key for entry in project.get("bib", {}).values() for key in entry["keys"]]
+    return []
+
+
+def complete(words: list, cword: int) -> list:
+    """
+    words 为完整的命令行 (words[0] 是程序名), cword 为正在补全的词的下标。
+    按命令树走到当前所在的 (子) 命令, 再补全子命令、选项或参数值。
+    """
+    index = global_index()
+    node = index.get("commands")
+    if not node:
+        return []
+    current = words[cword] if cword < len(words) else ""
+    expecting = None
+    for word in words[1:cword]:
+        if expecting is not None:
+            expecting = None
+            continue
+        if word.startswith("-"):
+            name, has_value, _ = word.partition("=")
+            if node.get("options", {}).get(name) and not has_value:
+                expecting = node["options"][name]
+            continue
+        if word in node.get("commands", {}):
+            node = node["commands"][word]
+
+    if expecting is not None:
+        items = candidates(expecting, index)
+    elif current.startswith("-"):
+        items = list(node.get("options", {})) + ["--help"]
+    elif node.get("commands"):
+        # 隐藏的别名 (如 zhang, yinyong) 只在已经输入了前缀时才提示
+        items = [name for name, child in node["commands"].items() if current or not child.get("hidden")]
+    else:
+        items = candidates(node.get("arguments"), index) if node.get("arguments") else []
+    return [item for item in dict.fromkeys(items) if item.startswith(current)]
+
+
+def main(args: list) -> int:
+    """`paw __complete CWORD WORD0 WORD1 ...`: 每行输出一个候选项"""
+    try:
+        cword = int(args[0])
+    except (IndexError, ValueError):
+        return 1
+    for item in complete(args[1:], cword):
+        print(item)
+    return 0
@@ -9,4 +9,17 @@ PAW_HOME_DIR = Path.home() / ".paw"
 CSL_DIR = PAW_HOME_DIR / "csl"
 
 # 全局 Word 模板库存放目录
-TEMPLATES_DIR = PAW_HOME_DIR / "templates"
\ No newline at end of file
+TEMPLATES_DIR = PAW_HOME_DIR / "templates"
+
+# paw daemon 监听的 Unix socket 与日志文件
+DAEMON_SOCKET = PAW_HOME_DIR / "daemon.sock"
+DAEMON_LOG = PAW_HOME_DIR / "daemon.log"
+
+# Shell 补全的全局索引 (命令树与全局 CSL/模板名)
+COMPLETION_INDEX = PAW_HOME_DIR / "completion.json"
+
+# paw new 在项目根目录写入的标记文件; 找到它即可确定项目根目录
+PROJECT_MARKER = ".paw-project"
+
+# 显式指定项目根目录的环境变量, 设置后不再向上查找
+PROJECT_ENV = "PAW_PROJECT"
@@ -0,0 +1,128 @@
+# 项目上下文: 在一次调用 (或 paw daemon 这样的常驻进程) 中共享项目路径、元数据与章节列表
+
+import typer
+from pathlib import Path
+from rich.console import Console
+from . import config, utils
+from .cache import stat_key
+
+console = Console()
+
+
+class ProjectContext:
+    """
+    一个 PAW 项目的上下文。
+
+    路径在创建时确定; 元数据、章节列表与参考文献按需加载并缓存,
+    以相关文件 (目录) 的 mtime + size 判断是否需要重新读取, 因此同一个对象
+    可以在常驻进程中长期复用, 文件改动后自动失效。
+    """
+    def __init__(self, root: Path):
+        self.root = root
+        self.manuscript = root / "manuscript"
+        self.resources = root / "resources"
+        self.figures = root / "figures"
+        self.output = root / "output"
+        self.metadata_path = self.manuscript / "metadata.yaml"
+        self._memo = {}
+
+    @property
+    def paths(self) -> dict:
+        """与 utils.get_project_paths() 相同格式的路径字典"""
+        return {
+            "root": self.root,
+            "manuscript": self.manuscript,
+            "resources": self.resources,
+            "figures": self.figures,
+            "output": self.output,
+            "metadata": self.metadata_path,
+        }
+
+    def _cached(self, name: str, stamp, load):
+        cached = self._memo.get(name)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        value = load()
+        self._memo[name] = (stamp, value)
+        return value
+
+    @property
+    def metadata(self) -> dict:
+        """解析后的 metadata.yaml。返回值被共享, 不要直接修改 (写入请用 edit_metadata)"""
+        if not self.metadata_path.exists():
+            return {}
+        return utils.load_yaml_file(self.metadata_path)
+
+    def edit_metadata(self) -> "utils.MetadataTransaction":
+        """批量修改 metadata.yaml 的事务, 用法见 utils.MetadataTransaction"""
+        return utils.MetadataTransaction(self.metadata_path)
+
+    def metadata_or_default(self) -> dict:
+        """读取 metadata.yaml; 解析失败时 (错误已打印) 返回空字典, 以默认设置继续"""
+        try:
+            return self.metadata
+        except typer.Exit:
+            return {}
+
+    @property
+    def chapters(self) -> list:
+        """
+        根据 input-files 逻辑决定章节列表: 优先使用 metadata.yaml 中的 input-files,
+        否则为 manuscript/ 下所有以数字开头的 .md 文件。增删章节会改变目录的 mtime, 从而使缓存失效。
+        """
+        stamp = (stat_key(self.metadata_path), stat_key(self.manuscript))
+        return self._cached("chapters", stamp, self._load_chapters)
+
+    def _load_chapters(self) -> list:
+        try:
+            input_files = self.metadata.get("input-files")
+            if input_files and isinstance(input_files, list):
+                return [str(self.root / file) for file in input_files]
+        except Exception:
+            pass
+        return [str(p) for p in sorted(self.manuscript.glob("[0-9]*.md"))]
+
+    @property
+    def bibliography(self) -> list:
+        """metadata.yaml 中 bibliography 字段列出的文件名"""
+        value = self.metadata_or_default().get("bibliography")
+        if not value:
+            return []
+        if isinstance(value, str):
+            return [value]
+        return [str(v) for v in value]
+
+    @property
+    def bibliography_paths(self) -> list:
+        """解析后的参考文献文件路径, 查找顺序与编译时相同; 找不到的文件以项目根目录下的路径返回"""
+        return [self.resolve_resource(name) or self.root / name for name in self.bibliography]
+
+    def resolve_resource(self, name: str) -> Path | None:
+        """按照 --resource-path 的顺序查找资源文件 (bib, csl, reference-doc)"""
+        candidate = Path(name)
+        if candidate.is_absolute():
+            return candidate if candidate.exists() else None
+        for directory in (self.root, self.resources, config.CSL_DIR, config.TEMPLATES_DIR):
+            if (directory / candidate).exists():
+                return directory / candidate
+        return None
+
+
+# 按项目根目录缓存的上下文, 常驻进程中的后续调用直接复用
+_contexts = {}
+
+
+def get_context() -> ProjectContext:
+    """返回当前目录所在 PAW 项目的上下文; 不在项目中时报错退出"""
+    root = utils.find_project_root()
+    if not root:
+        console.print("[bold red]Error:[/bold red] Not inside a PAW project. Could not find project root.")
+        raise typer.Exit(1)
+    ctx = _contexts.get(root)
+    if ctx is None:
+        ctx = ProjectContext(root)
+        if not ctx.metadata_path.exists():
+            console.print(f"[bold red]Error:[/bold red] Metadata file not found at '{ctx.metadata_path}'")
+            raise typer.Exit(1)
+        _contexts[root] = ctx
+    return ctx
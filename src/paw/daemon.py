@@ -0,0 +1,276 @@
+# paw daemon: 常驻进程。预先导入全部命令, 并在内存中保留元数据、文献库等解析结果,
+# 通过 Unix socket 依次执行 paw 客户端 (paw.client) 转交过来的命令。
+
+import errno
+import json
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from . import config
+
+# 默认空闲 30 分钟后自动退出
+IDLE_TIMEOUT = 30 * 60
+# 客户端与 daemon 必须来自同一份安装, 否则客户端自行执行命令
+PACKAGE_DIR = str(Path(__file__).resolve().parent)
+
+
+def is_supported() -> bool:
+    """需要 Unix socket 以及传递文件描述符的能力 (Python 3.9+)"""
+    return hasattr(socket, "AF_UNIX") and hasattr(socket, "send_fds")
+
+
+def request(message: dict, timeout: float = 2.0) -> dict | None:
+    """向 daemon 发送一条控制消息 (ping / stop) 并返回回复; daemon 未运行时返回 None"""
+    if not is_supported():
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(config.DAEMON_SOCKET))
+            socket.send_fds(sock, [b"C"], [])
+            sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+            line = sock.makefile("rb").readline()
+    except OSError:
+        return None
+    return json.loads(line) if line else None
+
+
+def _is_stale(socket_path: str) -> bool:
+    """socket 文件是否是异常退出的 daemon 留下的: 只有无人监听时才算, 连接超时或忙碌都不算"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        probe.settimeout(2.0)
+        try:
+            probe.connect(socket_path)
+        except OSError as e:
+            return e.errno in (errno.ECONNREFUSED, errno.ENOENT)
+    return False
+
+
+def _reply(conn: socket.socket, message: dict):
+    try:
+        conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+    except OSError:
+        pass
+
+
+def _refresh_consoles():
+    """
+    各模块的 Rich Console 在创建时就探测了终端的尺寸与颜色能力 (以及 NO_COLOR 等环境变量),
+    每个请求的输出都换到了新的终端, 因此为各模块换上新建的 Console。
+    """
+    from rich.console import Console
+    for name, module in list(sys.modules.items()):
+        console = getattr(module, "console", None) if name.startswith("paw") else None
+        if isinstance(console, Console):
+            module.console = Console(stderr=console.stderr)
+
+
+class Daemon:
+    """
+    每个连接由单独的线程接收; ping / stop 等控制消息立即回复, 不必等待正在执行的命令。
+    命令会重定向本进程的标准输入输出、工作目录与环境变量, 因此放入队列, 在主线程中依次执行
+    (主线程才能收到 SIGINT, 以便中止命令)。
+    """
+    def __init__(self, idle_timeout: float = IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self.started = time.time()
+        self.served = 0
+        self._interrupt_lock = threading.Lock()
+        # 正在执行的请求序号 (None 表示空闲), 防止上一个请求的监视线程误中止下一个请求
+        self._running = None
+        # 只在命令执行期间响应 _watch_client 发出的 SIGINT; 之后才送达的信号被丢弃
+        self._interruptible = False
+        self._interrupt_requested = False
+        # 等待在主线程中执行的命令: (conn, message, fds, reader); None 表示停止
+        self._requests = queue.Queue()
+        self._stopping = threading.Event()
+
+    def serve(self):
+        from .main import app, load_all_commands
+        load_all_commands()  # 预先导入全部命令, 之后的请求不再付出导入开销
+        self.app = app
+
+        config.PAW_HOME_DIR.mkdir(exist_ok=True)
+        socket_path = str(config.DAEMON_SOCKET)
+        if os.path.exists(socket_path):
+            if not _is_stale(socket_path):
+                raise RuntimeError(f"paw daemon is already running ({socket_path}).")
+            os.unlink(socket_path)  # 上一个 daemon 异常退出留下的 socket
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(socket_path)
+        os.chmod(socket_path, 0o600)
+        inode = os.stat(socket_path).st_ino
+        server.listen(16)
+        previous_handler = signal.signal(signal.SIGINT, self._on_sigint)
+        threading.Thread(target=self._accept, args=(server,), daemon=True).start()
+        # 不占用启动时所在的目录
+        os.chdir(config.PAW_HOME_DIR)
+        try:
+            while True:
+                try:
+                    item = self._requests.get(timeout=self.idle_timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    break
+                conn, message, fds, reader = item
+                with conn:
+                    try:
+                        code = self._run(message, fds, reader)
+                    except KeyboardInterrupt:
+                        code = 130  # 命令结束后的清理阶段才收到的中断, 不应让 daemon 退出
+                    self.served += 1
+                    _reply(conn, {"exit": code})
+        finally:
+            signal.signal(signal.SIGINT, previous_handler)
+            self._stopping.set()
+            server.close()
+            # 还在排队的命令交回客户端自行执行
+            while True:
+                try:
+                    item = self._requests.get_nowait()
+                except queue.Empty:
+                    break
+                if item:
+                    conn, _, fds, _ = item
+                    for fd in fds:
+                        os.close(fd)
+                    with conn:
+                        _reply(conn, {"fallback": True})
+            # 只删除自己创建的 socket (可能已被新的 daemon 替换)
+            try:
+                if os.stat(socket_path).st_ino == inode:
+                    os.unlink(socket_path)
+            except OSError:
+                pass
+
+    def _accept(self, server: socket.socket):
+        while not self._stopping.is_set():
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: socket.socket):
+        """在连接线程中读取一条消息: 控制消息直接回复, 命令交给主线程排队执行"""
+        # 客户端连接后立即发送消息, 握手阶段不应无限等待
+        conn.settimeout(5)
+        try:
+            _, fds, _, _ = socket.recv_fds(conn, 1, 3)
+            reader = conn.makefile("rb")
+            line = reader.readline()
+        except OSError:
+            conn.close()
+            return
+        conn.settimeout(None)
+        try:
+            message = json.loads(line or b"{}")
+        except ValueError:
+            message = {}
+
+        control = message.get("control")
+        if control or len(fds) != 3 or message.get("package") != PACKAGE_DIR or self._stopping.is_set():
+            for fd in fds:
+                os.close(fd)
+            with conn:
+                if control == "ping":
+                    _reply(conn, {"pid": os.getpid(), "uptime": time.time() - self.started, "served": self.served, "idle_timeout": self.idle_timeout})
+                elif control == "stop":
+                    _reply(conn, {"stopped": True})
+                    self._stopping.set()
+                    self._requests.put(None)
+                else:
+                    _reply(conn, {"fallback": True})
+            return
+        self._requests.put((conn, message, fds, reader))
+
+    def _on_sigint(self, signum, frame):
+        if self._interrupt_requested:
+            # 客户端要求中止: 命令已经结束时什么都不做, 以免 KeyboardInterrupt 打断清理或退出 daemon
+            self._interrupt_requested = False
+            if not self._interruptible:
+                return
+        # 在前台运行 (paw daemon run) 时终端的 Ctrl+C: 中止当前命令, 空闲时停止 daemon
+        raise KeyboardInterrupt
+
+    def _run(self, message: dict, fds: list, reader) -> int:
+        """在客户端的终端、工作目录与环境变量下执行一条 paw 命令, 返回退出码"""
+        saved_fds = [os.dup(i) for i in range(3)]
+        saved_streams = (sys.stdin, sys.stdout, sys.stderr)
+        saved_env = dict(os.environ)
+        self._running = self.served
+        threading.Thread(target=self._watch_client, args=(reader, self.served), daemon=True).start()
+        code = 1
+        try:
+            # 重定向到客户端的终端; Pandoc 等子进程会继承这些文件描述符
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+                os.close(fd)
+            sys.stdin = open(0, "r", encoding="utf-8", errors="replace", closefd=False)
+            sys.stdout = open(1, "w", buffering=1, encoding="utf-8", errors="replace", closefd=False)
+            sys.stderr = open(2, "w", buffering=1, encoding="utf-8", errors="replace", closefd=False)
+            os.environ.clear()
+            os.environ.update(message.get("env", {}))
+            os.chdir(message["cwd"])
+            _refresh_consoles()
+            self._interruptible = True
+            try:
+                self.app(args=message["argv"], prog_name="paw")
+            finally:
+                self._interruptible = False
+            code = 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except KeyboardInterrupt:
+            code = 130
+        except Exception:
+            traceback.print_exc()
+        finally:
+            with self._interrupt_lock:
+                self._running = None
+            for stream in (sys.stdout, sys.stderr):
+                try:
+                    stream.flush()
+                except OSError:
+                    pass
+            sys.stdin, sys.stdout, sys.stderr = saved_streams
+            for target, fd in enumerate(saved_fds):
+                os.dup2(fd, target)
+                os.close(fd)
+            os.environ.clear()
+            os.environ.update(saved_env)
+            os.chdir(config.PAW_HOME_DIR)
+        return code
+
+    def _watch_client(self, reader, request_id: int):
+        """客户端按下 Ctrl+C (或直接断开) 时中止正在执行的命令"""
+        while True:
+            try:
+                line = reader.readline()
+            except (OSError, ValueError):
+                line = b""
+            if line and b"interrupt" not in line:
+                continue
+            with self._interrupt_lock:
+                if self._running != request_id:
+                    return
+                build = sys.modules.get("paw.commands.build")
+                if build:
+                    build.cancel_builds()
+                # 真正的信号可以打断主线程中阻塞的读写 (例如等待用户输入)
+                self._interrupt_requested = True
+                os.kill(os.getpid(), signal.SIGINT)
+            if not line:
+                return
+
+
+def serve(idle_timeout: float = IDLE_TIMEOUT):
+    Daemon(idle_timeout).serve()
@@ -0,0 +1,118 @@
+# 逐行解析 Pandoc / pandoc-crossref / LaTeX 的输出, 生成结构化的诊断信息
+
+import re
+from dataclasses import dataclass
+
+_PASS_START = re.compile(r"^This is (XeTeX|pdfTeX|LuaTeX|LuaHBTeX|e-TeX|TeX), Version")
+_FILE_LINE_ERROR = re.compile(r"^(\S+?\.(?:tex|sty|cls|cfg|def)):(\d+): (.*)")
+_TEX_ERROR = re.compile(r"^! (.*)")
+_TEX_ERROR_LINE = re.compile(r"^l\.(\d+)")
+_BOX = re.compile(r"^(Overfull|Underfull) \\([hv]box)")
+_BOX_LINE = re.compile(r"at lines? (\d+)")
+_LATEX_CITATION = re.compile(r"(?:LaTeX|Package natbib) Warning: Citation [`'](.+?)' .*undefined(?: on input line (\d+))?")
+_LATEX_REFERENCE = re.compile(r"LaTeX Warning: Reference [`'](.+?)' .*undefined(?: on input line (\d+))?")
+_LATEX_WARNING = re.compile(r"^(?:LaTeX|Package \S+|Class \S+) Warning: (.*?)(?: on input line (\d+))?\.?$")
+_CITEPROC_MISSING = re.compile(r"Citeproc: citation (\S+) not found")
+_CROSSREF_UNDEFINED = re.compile(r"Undefined cross-reference: (\S+)")
+_PANDOC_WARNING = re.compile(r"^\[WARNING\] (.*)")
+_PANDOC_ERROR = re.compile(r"^(?:pandoc: |\[ERROR\] |Error producing PDF)(.*)")
+_PANDOC_POSITION = re.compile(r"(?:at |source )?(?:\"?([^\"\s]+)\"? )?\(?line (\d+),? column \d+\)?")
+
+
+@dataclass
+class Diagnostic:
+    """一条诊断: kind 为 error / missing-citation / undefined-reference / overfull-box / underfull-box / warning"""
+    kind: str
+    message: str
+    file: str | None = None
+    line: int | None = None
+
+    @property
+    def fatal(self) -> bool:
+        return self.kind == "error"
+
+    def location(self) -> str:
+        if self.file and self.line:
+            return f"{self.file}:{self.line}"
+        if self.line:
+            return f"line {self.line}"
+        return self.file or ""
+
+
+class OutputParser:
+    """
+    增量地解析子进程输出。每次 feed 一行, 返回识别出的 Diagnostic (或 None)。
+    LaTeX 每开始新的一遍编译时 passes 加一, 供进度显示使用。
+    """
+    def __init__(self, default_file: str | None = None):
+        self.default_file = default_file
+        self.diagnostics = []
+        self.passes = 0
+        self._pending_error = None
+
+    def feed(self, line: str) -> Diagnostic | None:
+        line = line.rstrip("\r\n")
+        diagnostic = self._classify(line)
+        if diagnostic:
+            self.diagnostics.append(diagnostic)
+        return diagnostic
+
+    def _classify(self, line: str) -> Diagnostic | None:
+        if _PASS_START.match(line):
+            self.passes += 1
+            return None
+
+        # "! Undefined control sequence." 之后的 "l.42 ..." 给出出错行号
+        if self._pending_error is not None:
+            match = _TEX_ERROR_LINE.match(line)
+            if match:
+                self._pending_error.line = int(match.group(1))
+                self._pending_error = None
+                return None
+
+        match = _FILE_LINE_ERROR.match(line)
+        if match:
+            return Diagnostic("error", match.group(3), match.group(1), int(match.group(2)))
+        match = _TEX_ERROR.match(line)
+        if match:
+            self._pending_error = Diagnostic("error", match.group(1), self.default_file)
+            return self._pending_error
+
+        match = _BOX.match(line)
+        if match:
+            kind = "overfull-box" if match.group(1) == "Overfull" else "underfull-box"
+            line_match = _BOX_LINE.search(line)
+            box_line = int(line_match.group(1)) if line_match else None
+            return Diagnostic(kind, line, self.default_file, box_line)
+
+        match = _CITEPROC_MISSING.search(line) or _LATEX_CITATION.search(line)
+        if match:
+            cite_line = int(match.group(2)) if match.lastindex and match.lastindex >= 2 and match.group(2) else None
+            return Diagnostic("missing-citation", f"Citation '{match.group(1)}' not found", self.default_file if cite_line else None, cite_line)
+        match = _CROSSREF_UNDEFINED.search(line)
+        if match:
+            return Diagnostic("undefined-reference", f"Undefined cross-reference '{match.group(1)}'")
+        match = _LATEX_REFERENCE.search(line)
+        if match:
+            ref_line = int(match.group(2)) if match.group(2) else None
+            return Diagnostic("undefined-reference", f"Undefined reference '{match.group(1)}'", self.default_file, ref_line)
+
+        match = _LATEX_WARNING.match(line)
+        if match:
+            warn_line = int(match.group(2)) if match.group(2) else None
+            return Diagnostic("warning", match.group(1), self.default_file if warn_line else None, warn_line)
+        match = _PANDOC_WARNING.match(line)
+        if match:
+            return self._with_position(Diagnostic("warning", match.group(1)))
+        match = _PANDOC_ERROR.match(line)
+        if match:
+            return self._with_position(Diagnostic("error", match.group(1).strip() or line))
+        return None
+
+    @staticmethod
+    def _with_position(diagnostic: Diagnostic) -> Diagnostic:
+        match = _PANDOC_POSITION.search(diagnostic.message)
+        if match:
+            diagnostic.file = match.group(1)
+            diagnostic.line = int(match.group(2))
+        return diagnostic
@@ -0,0 +1,41 @@
+# 项目根目录的查找。只依赖标准库, 供 Shell 补全等不能导入 Typer/Rich 的轻量路径使用
+
+import os
+from pathlib import Path
+from . import config
+
+
+# 按工作目录缓存的项目根目录 (只缓存找到的结果, 之后新建的项目不会被漏掉)
+_project_roots = {}
+
+
+def find_project_root() -> Path | None:
+    """
+    确定项目根目录:
+    1. 环境变量 PAW_PROJECT 指定的目录 (不访问文件系统);
+    2. 从当前目录向上查找 paw new 写入的 .paw-project 标记, 或 Makefile + manuscript/ (旧项目)。
+    查找结果按工作目录缓存, paw daemon 等常驻进程中同一目录不会重复查找。
+    """
+    explicit = os.environ.get(config.PROJECT_ENV)
+    if explicit:
+        return Path(os.path.abspath(os.path.expanduser(explicit)))
+
+    cwd = os.getcwd()
+    root = _project_roots.get(cwd)
+    if root is None:
+        root = _search_project_root(Path(cwd))
+        if root:
+            _project_roots[cwd] = root
+    return root
+
+
+def _search_project_root(current_dir: Path) -> Path | None:
+    for _ in range(8):
+        if (current_dir / config.PROJECT_MARKER).is_file():
+            return current_dir
+        if (current_dir / "Makefile").exists() and (current_dir / "manuscript").is_dir():
+            return current_dir
+        if current_dir.parent == current_dir:
+            break
+        current_dir = current_dir.parent
+    return None
@@ -0,0 +1,173 @@
+# 编译前的图片预处理: 按输出格式转换/压缩图片, 以内容哈希为键缓存在 output/.cache/figures
+
+import hashlib
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow 是可选依赖: pip install "paw-cli[figures]"
+    Image = None
+
+DEFAULT_DPI = 300
+# 图片最宽按版心宽度 (英寸) 计, 超出 figure-dpi 所需像素的位图会被缩小
+MAX_WIDTH_INCHES = 6.5
+
+VECTOR_SUFFIXES = {".svg"}
+RASTER_SUFFIXES = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".webp", ".gif"}
+# 可以直接嵌入的位图格式, 其他位图一律转换 (浏览器还能直接显示 GIF/WebP)
+_NATIVE_RASTER = {".png", ".jpg", ".jpeg"}
+_NATIVE_WEB_RASTER = _NATIVE_RASTER | {".gif", ".webp"}
+# 这些颜色模式多半是照片, 转换为 JPEG 而不是 PNG
+_PHOTO_MODES = {"CMYK", "YCbCr"}
+
+# 输出格式 -> 图片处理方案
+#   latex:  SVG 转为 PDF (矢量), 位图缩小并转为 PNG/JPEG
+#   office: SVG 栅格化为 PNG, 位图同上
+#   web:    SVG 保持不变, 位图同上
+FIGURE_PROFILES = {
+    "pdf": "latex",
+    "latex": "latex",
+    "beamer": "latex",
+    "docx": "office",
+    "odt": "office",
+    "pptx": "office",
+    "html": "web",
+    "html5": "web",
+    "epub": "web",
+    "epub3": "web",
+}
+
+
+def figure_profile(output_format: str) -> str | None:
+    return FIGURE_PROFILES.get(output_format)
+
+
+def max_pixels(dpi: int) -> int:
+    return round(dpi * MAX_WIDTH_INCHES)
+
+
+def converter_versions(manifest) -> dict:
+    """参与缓存键的转换工具版本"""
+    return {
+        "rsvg-convert": manifest.tool_version("rsvg-convert"),
+        "pillow": Image.__version__ if Image else "missing",
+    }
+
+
+def collect_images(node, urls: list | None = None) -> list:
+    """按出现顺序收集 Pandoc JSON AST 中所有 Image 的目标地址"""
+    if urls is None:
+        urls = []
+    if isinstance(node, dict):
+        if node.get("t") == "Image":
+            url = node["c"][2][0]
+            if url not in urls:
+                urls.append(url)
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                collect_images(value, urls)
+    elif isinstance(node, list):
+        for item in node:
+            if isinstance(item, (dict, list)):
+                collect_images(item, urls)
+    return urls
+
+
+def rewrite_images(node, mapping: dict):
+    """就地把 AST 中 Image 的目标地址替换为 mapping 中的缓存文件"""
+    if isinstance(node, dict):
+        if node.get("t") == "Image":
+            target = node["c"][2]
+            if target[0] in mapping:
+                target[0] = mapping[target[0]]
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                rewrite_images(value, mapping)
+    elif isinstance(node, list):
+        for item in node:
+            if isinstance(item, (dict, list)):
+                rewrite_images(item, mapping)
+
+
+def raster_info(path: Path) -> list | None:
+    """只读取位图文件头, 返回 [宽, 高, 颜色模式]; Pillow 不可用或无法识别时返回 None"""
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as image:
+            return [image.width, image.height, image.mode]
+    except Exception:
+        return None
+
+
+def plan_conversion(source: Path, content_hash: str, profile: str, dpi: int, info: list | None, cache_dir: Path, versions: dict) -> dict | None:
+    """
+    决定一张图片在给定方案下是否需要转换。不需要时返回 None (保持原引用),
+    否则返回转换任务, 其中 output 为内容寻址的缓存文件路径。
+    """
+    suffix = source.suffix.lower()
+    if suffix in VECTOR_SUFFIXES:
+        if profile == "web" or versions["rsvg-convert"] == "missing":
+            return None
+        kind, extension = ("svg-pdf", ".pdf") if profile == "latex" else ("svg-png", ".png")
+        tool = versions["rsvg-convert"]
+    elif suffix in RASTER_SUFFIXES:
+        if info is None:
+            return None
+        width, height, mode = info
+        native = _NATIVE_WEB_RASTER if profile == "web" else _NATIVE_RASTER
+        if suffix in native and max(width, height) <= max_pixels(dpi):
+            return None
+        kind = "raster"
+        extension = ".jpg" if suffix in (".jpg", ".jpeg") or mode in _PHOTO_MODES else ".png"
+        tool = versions["pillow"]
+    else:
+        return None
+
+    # 同一张图片在不同方案下可能得到相同的转换结果, 因此键中只包含转换方式而不是方案名
+    key = hashlib.sha256(f"{content_hash}:{kind}:{extension}:{dpi}:{tool}".encode("utf-8")).hexdigest()[:32]
+    return {"kind": kind, "source": str(source), "output": str(cache_dir / f"{key}{extension}"), "dpi": dpi}
+
+
+def convert_figure(job: dict) -> str | None:
+    """
+    执行一个转换任务 (在工作进程中运行)。成功返回 None, 失败返回错误信息。
+    结果先写入临时文件再原子地重命名, 不会留下半截的缓存。
+    """
+    output = Path(job["output"])
+    tmp_path = output.with_name(f".{output.stem}.{os.getpid()}{output.suffix}")
+    try:
+        if job["kind"] == "raster":
+            _convert_raster(Path(job["source"]), tmp_path, job["dpi"])
+        else:
+            fmt = "pdf" if job["kind"] == "svg-pdf" else "png"
+            dpi = str(job["dpi"])
+            command = [shutil.which("rsvg-convert") or "rsvg-convert", "-f", fmt, "-d", dpi, "-p", dpi, "-o", str(tmp_path), job["source"]]
+            result = subprocess.run(command, capture_output=True, text=True, encoding="utf-8", errors="replace")
+            if result.returncode != 0:
+                return result.stderr.strip() or f"rsvg-convert exited with code {result.returncode}"
+        os.replace(tmp_path, output)
+        return None
+    except Exception as e:
+        return str(e)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def _convert_raster(source: Path, output: Path, dpi: int):
+    limit = max_pixels(dpi)
+    with Image.open(source) as image:
+        # 多页 TIFF / 动图只取第一帧
+        image.seek(0)
+        image.draft(image.mode, (limit, limit))  # JPEG 可以直接按缩小后的尺寸解码
+        if image.mode not in ("1", "L", "LA", "P", "RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        image.thumbnail((limit, limit), Image.LANCZOS)
+        if output.suffix == ".jpg":
+            image.convert("RGB").save(output, "JPEG", quality=90, optimize=True, progressive=True, dpi=(dpi, dpi))
+        else:
+            image.save(output, "PNG", optimize=True, dpi=(dpi, dpi))
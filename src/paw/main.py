@@ -2,73 +2,87 @@ import warnings
 warnings.filterwarnings("ignore", category=UserWarning, message="pkg_resources is deprecated")
 
 import typer
-from .commands import (
-    new as new_cmd,
-    check as check_cmd,
-    csl as csl_cmd,
-    template as template_cmd,
-    add as add_cmd,
-    cite as cite_cmd,
-    zotero as zotero_cmd,
-    easter_eggs as easter_eggs_cmd,
-    shake as shake_cmd,
-    build as build_cmd,
-)
+from .registry import LazyCommand, LazyGroup
 
-app = typer.Typer(
-    name="paw",
-    help="🐾 PAW: Your loyal academic companion. Let me lend a paw!",
-    add_completion=False,
-    no_args_is_help=True,
-)
+# 命令注册表: 命令名 -> paw.commands 中的 "模块:函数或 Typer 子应用"。
+# 模块只在命令真正执行时才导入, `paw meow` 或 `paw --help` 不必加载 ruamel.yaml / requests 等重型依赖。
+COMMANDS = {
+    # --- 核心功能命令 ---
+    "new": LazyCommand("new:new", "创建一个新的 PAW 学术项目。"),
+    "chuangjian": LazyCommand("new:new", 'Alias for "new".', hidden=True),
+
+    "check": LazyCommand("check:check", "检查核心依赖 (Pandoc, LaTeX)。"),
+    "c": LazyCommand("check:check", 'Alias for "check".', hidden=True),
+    "jiancha": LazyCommand("check:check", 'Alias for "check".', hidden=True),
+    "dig": LazyCommand("check:check", "深入诊断项目依赖。 Alias for 'check'."),
+    "purr": LazyCommand("check:check_purr", "检查项目健康状态 (如果一切正常会发出呼噜声)。"),
+
+    # --- 编译命令 (推荐) ---
+    "build": LazyCommand("build:build", "编译项目, 生成最终文档。"),
+    "b": LazyCommand("build:build", 'Alias for "build".', hidden=True),
+
+    # --- 内容管理命令组 ---
+    "add": LazyCommand("add:app", "向当前项目中添加新内容, 如章节、图片、参考文献等。"),
+    "meta": LazyCommand("meta:app", "批量修改 manuscript/metadata.yaml (保留注释, 一次性原子写回)。"),
 
-# --- 核心功能命令 ---
-app.command(name="new", help="创建一个新的 PAW 学术项目。")(new_cmd.new)
-app.command(name="chuangjian", help='Alias for "new".', hidden=True)(new_cmd.new)
+    # --- 引用命令 ---
+    "cite": LazyCommand("cite:cite", "交互式搜索本地 .bib 文件并复制引用键。"),
+    "yinyong": LazyCommand("cite:cite", 'Alias for "cite".', hidden=True),
+    "hunt": LazyCommand("cite:cite", "搜寻本地文献。 Alias for 'cite'."),
 
-app.command(name="check", help="检查核心依赖 (Pandoc, LaTeX)。")(check_cmd.check)
-app.command(name="c", help='Alias for "check".', hidden=True)(check_cmd.check)
-app.command(name="jiancha", help='Alias for "check".', hidden=True)(check_cmd.check)
-app.command(name="dig", help="深入诊断项目依赖。 Alias for 'check'.")(check_cmd.check)
-app.command(name="purr", help="检查项目健康状态 (如果一切正常会发出呼噜声)。")(check_cmd.check_purr)
+    "zotero": LazyCommand("zotero:zotero", '触发 Zotero CAYW 搜索框。 Alias: "z".'),
+    "z": LazyCommand("zotero:zotero", 'Alias for "zotero".', hidden=True),
 
-# --- 编译命令 (推荐) ---
-app.command(name="build", help="编译项目, 生成最终文档。")(build_cmd.build)
-app.command(name="b", help='Alias for "build".', hidden=True)(build_cmd.build)
+    # --- 资源管理命令组 ---
+    "csl": LazyCommand("csl:app", "管理全局 CSL (Citation Style Language) 样式文件。"),
+    "style": LazyCommand("csl:app", 'Alias for "csl".', hidden=True),
+    "yangshi": LazyCommand("csl:app", 'Alias for "csl".', hidden=True),
 
+    "template": LazyCommand("template:app", "管理全局 Word (.docx) 模板文件。"),
+    "tmpl": LazyCommand("template:app", 'Alias for "template".', hidden=True),
+    "moban": LazyCommand("template:app", 'Alias for "template".', hidden=True),
 
-# --- 内容管理命令组 ---
-app.add_typer(add_cmd.app, name="add")
+    # --- Shell 补全 ---
+    "completion": LazyCommand("completion:app", "安装 Shell 补全 (基于预先生成的索引, 按 TAB 时不导入 Typer/Rich)。"),
 
-# --- 引用命令 ---
-app.command(name="cite", help="交互式搜索本地 .bib 文件并复制引用键。")(cite_cmd.cite)
-app.command(name="yinyong", help='Alias for "cite".', hidden=True)(cite_cmd.cite)
-app.command(name="hunt", help="搜寻本地文献。 Alias for 'cite'.")(cite_cmd.cite)
+    # --- 常驻后台进程 ---
+    "daemon": LazyCommand("daemon:app", "管理常驻的 PAW 后台进程, 让 build / cite / woof 跳过启动与解析开销。"),
 
-app.command(name="zotero", help='触发 Zotero CAYW 搜索框。 Alias: "z".')(zotero_cmd.zotero)
-app.command(name="z", help='Alias for "zotero".', hidden=True)(zotero_cmd.zotero)
+    # --- 趣味性与实用工具 ---
+    "shake": LazyCommand("shake:shake", "清理输出目录 (像狗狗甩水一样)。"),
+    "meow": LazyCommand("easter_eggs:meow", "显示一条随机的学术写作小贴士。"),
+    "woof": LazyCommand("easter_eggs:woof", "快速汇报项目统计信息。"),
 
+    # --- 隐藏彩蛋 ---
+    "paw": LazyCommand("easter_eggs:show_paw", hidden=True),
+    "🐾": LazyCommand("easter_eggs:show_paw", 'Alias for "paw".', hidden=True),
+    "who-is-a-good-writer": LazyCommand("easter_eggs:praise", hidden=True),
+}
 
-# --- 资源管理命令组 ---
-app.add_typer(csl_cmd.app, name="csl")
-app.add_typer(csl_cmd.app, name="style", help='Alias for "csl".', hidden=True)
-app.add_typer(csl_cmd.app, name="yangshi", help='Alias for "csl".', hidden=True)
 
-app.add_typer(template_cmd.app, name="template")
-app.add_typer(template_cmd.app, name="tmpl", help='Alias for "template".', hidden=True)
-app.add_typer(template_cmd.app, name="moban", help='Alias for "template".', hidden=True)
+class PawGroup(LazyGroup):
+    lazy_commands = COMMANDS
+
+
+app = typer.Typer(
+    name="paw",
+    help="🐾 PAW: Your loyal academic companion. Let me lend a paw!",
+    add_completion=False,
+    no_args_is_help=True,
+    cls=PawGroup,
+)
+
 
+@app.callback()
+def _root():
+    # 所有命令都在 COMMANDS 中按需注册; 有了这个回调, Typer 才会把 app 构建为命令组
+    pass
 
-# --- 趣味性与实用工具 ---
-app.command(name="shake", help="清理输出目录 (像狗狗甩水一样)。")(shake_cmd.shake)
-app.command(name="meow", help="显示一条随机的学术写作小贴士。")(easter_eggs_cmd.meow)
-app.command(name="woof", help="快速汇报项目统计信息。")(easter_eggs_cmd.woof)
 
+def load_all_commands():
+    """导入全部命令模块 (供 paw daemon 预热)"""
+    PawGroup().load_all()
 
-# --- 隐藏彩蛋 ---
-app.command(name="paw", hidden=True)(easter_eggs_cmd.show_paw)
-app.command(name="🐾", help='Alias for "paw".', hidden=True)(easter_eggs_cmd.show_paw)
-app.command(name="who-is-a-good-writer", hidden=True)(easter_eggs_cmd.praise)
 
 # 添加一个 main 函数以适配可能的未来扩展
 def main():
@@ -0,0 +1,107 @@
+# 章节 AST 的拼接。各章节单独解析 (见 commands/build.parse_chapters) 与把全部章节交给一次 Pandoc 解析
+# 有两处不同, 这里负责弥补: 自动生成的标题 ID 在章节之间可能重复; 引用链接与脚注的定义无法跨章节解析。
+# 只依赖标准库。
+
+import re
+
+_REFERENCE_DEFINITION = re.compile(r"^ {0,3}\[(\^?[^\[\]\n]+)\]:", re.M)
+_BRACKETED = re.compile(r"\[(\^?[^\[\]\n]+)\]")
+
+
+def _label(text: str) -> str:
+    """引用标签不区分大小写, 连续空白视为一个空格"""
+    return " ".join(text.split()).casefold()
+
+
+def has_cross_chapter_references(texts: list) -> bool:
+    """
+    是否有章节用到了定义在其他章节中的引用链接 ([text][label]、[label]) 或脚注 ([^id])。
+    单独解析时这些引用无法解析, 此时应把全部章节交给一次 Pandoc 解析。判断偏保守: 宁可多合并解析一次。
+    """
+    definitions = [{_label(label) for label in _REFERENCE_DEFINITION.findall(text)} for text in texts]
+    for i, text in enumerate(texts):
+        elsewhere = set().union(*(labels for j, labels in enumerate(definitions) if j != i)) - definitions[i]
+        if elsewhere and any(_label(label) in elsewhere for label in _BRACKETED.findall(text)):
+            return True
+    return False
+
+
+def _stringify(inlines: list) -> str:
+    """行内元素的纯文本 (与 pandoc.utils.stringify 相同, 脚注不计入)"""
+    parts = []
+    for inline in inlines:
+        kind, content = inline.get("t"), inline.get("c")
+        if kind == "Str":
+            parts.append(content)
+        elif kind in ("Space", "SoftBreak", "LineBreak"):
+            parts.append(" ")
+        elif kind in ("Code", "Math"):
+            parts.append(content[1])
+        elif kind in ("Emph", "Strong", "Strikeout", "Superscript", "Subscript", "SmallCaps", "Underline"):
+            parts.append(_stringify(content))
+        elif kind in ("Link", "Image", "Span", "Quoted", "Cite"):
+            parts.append(_stringify(content[1]))
+    return "".join(parts)
+
+
+def auto_identifier(inlines: list) -> str:
+    """按 Pandoc 的 auto_identifiers 规则由标题文本生成 ID (不含去重)"""
+    text = "".join(c for c in _stringify(inlines).lower() if c.isalnum() or c in "-_." or c.isspace())
+    text = "-".join(text.split())
+    text = text[next((i for i, c in enumerate(text) if c.isalpha()), len(text)):]
+    return text or "section"
+
+
+def _unique(base: str, used: set) -> str:
+    if base not in used:
+        return base
+    n = 1
+    while f"{base}-{n}" in used:
+        n += 1
+    return f"{base}-{n}"
+
+
+def _headers(node):
+    """按文档顺序遍历所有 Header (包括 Div 等容器中的)"""
+    if isinstance(node, dict):
+        if node.get("t") == "Header":
+            yield node
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                yield from _headers(value)
+    elif isinstance(node, list):
+        for item in node:
+            if isinstance(item, (dict, list)):
+                yield from _headers(item)
+
+
+def dedupe_header_ids(blocks: list, used: set):
+    """
+    就地为自动生成的标题 ID 去重, 结果与合并解析时相同 (introduction, introduction-1, ...)。
+    与标题文本生成的 ID 一致 (或只多了 -N 后缀) 的视为自动生成, 其余为手写的 ID, 保持不变。
+    used 为此前章节中已经使用的 ID, 会被更新。
+    """
+    for header in _headers(blocks):
+        attr = header["c"][1]
+        identifier = attr[0]
+        if not identifier:
+            continue
+        base = auto_identifier(header["c"][2])
+        if identifier == base or re.fullmatch(re.escape(base) + r"-\d+", identifier):
+            identifier = attr[0] = _unique(base, used)
+        used.add(identifier)
+
+
+def assemble(chapter_asts: list) -> dict:
+    """按章节顺序拼接各章节的 AST; 同名元数据以先出现的章节为准"""
+    document = None
+    used = set()
+    for chapter_ast in chapter_asts:
+        dedupe_header_ids(chapter_ast.get("blocks", []), used)
+        if document is None:
+            document = chapter_ast
+            continue
+        for key, value in chapter_ast.get("meta", {}).items():
+            document["meta"].setdefault(key, value)
+        document["blocks"].extend(chapter_ast.get("blocks", []))
+    return document
@@ -0,0 +1,187 @@
+# 全屏的交互式引用选择器: 边输入边检索, 只渲染当前一页, Tab 多选
+
+import os
+import sys
+from rich.console import Console, Group
+from rich.live import Live
+from rich.markup import escape
+from rich.text import Text
+
+# 读到的按键 (除可打印字符外)
+UP, DOWN, PAGE_UP, PAGE_DOWN, ENTER, TAB, BACKSPACE, ESCAPE, CLEAR = (
+    "up", "down", "page-up", "page-down", "enter", "tab", "backspace", "escape", "clear"
+)
+
+_ESCAPE_SEQUENCES = {
+    "\x1b[A": UP, "\x1bOA": UP, "\x1b[B": DOWN, "\x1bOB": DOWN,
+    "\x1b[5~": PAGE_UP, "\x1b[6~": PAGE_DOWN,
+}
+_CONTROL_KEYS = {
+    "\r": ENTER, "\n": ENTER, "\t": TAB, "\x7f": BACKSPACE, "\x08": BACKSPACE,
+    "\x1b": ESCAPE, "\x03": ESCAPE, "\x15": CLEAR,
+    "\x10": UP, "\x0e": DOWN,  # Ctrl-P / Ctrl-N
+}
+_WINDOWS_KEYS = {"H": UP, "P": DOWN, "I": PAGE_UP, "Q": PAGE_DOWN}
+
+
+def is_interactive() -> bool:
+    return sys.stdin.isatty() and sys.stdout.isatty()
+
+
+class _Keyboard:
+    """把终端切换到逐键读取模式; 每次 read() 返回一批按键 (粘贴的文本会一次性读到)"""
+    def __enter__(self):
+        try:
+            import termios
+            import tty
+        except ImportError:
+            self._fd = None
+            return self
+        self._fd = sys.stdin.fileno()
+        self._saved = termios.tcgetattr(self._fd)
+        tty.setcbreak(self._fd)
+        # 关闭 ISIG, 让 Ctrl-C 作为普通按键读到, 以便恢复终端后再退出
+        attrs = termios.tcgetattr(self._fd)
+        attrs[3] &= ~termios.ISIG
+        termios.tcsetattr(self._fd, termios.TCSANOW, attrs)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            import termios
+            termios.tcsetattr(self._fd, termios.TCSADRAIN, self._saved)
+
+    def read(self) -> list:
+        if self._fd is None:
+            return self._read_windows()
+        data = os.read(self._fd, 1024)
+        while True:
+            try:
+                text = data.decode("utf-8")
+                break
+            except UnicodeDecodeError:
+                # 多字节字符被截断, 继续读完
+                data += os.read(self._fd, 1024)
+        return _split_keys(text)
+
+    @staticmethod
+    def _read_windows() -> list:
+        import msvcrt
+        char = msvcrt.getwch()
+        if char in ("\x00", "\xe0"):
+            return [_WINDOWS_KEYS.get(msvcrt.getwch(), "")]
+        keys = _split_keys(char)
+        while msvcrt.kbhit():
+            keys.extend(_split_keys(msvcrt.getwch()))
+        return keys
+
+
+def _split_keys(text: str) -> list:
+    keys = []
+    i = 0
+    while i < len(text):
+        for sequence, key in _ESCAPE_SEQUENCES.items():
+            if text.startswith(sequence, i):
+                keys.append(key)
+                i += len(sequence)
+                break
+        else:
+            char = text[i]
+            keys.append(_CONTROL_KEYS.get(char, char if char.isprintable() else ""))
+            i += 1
+    return [key for key in keys if key]
+
+
+class CitationPicker:
+    """
+    session 为 bibindex.SearchSession, format_entry 把一条 BibRecord 格式化为 Rich 标记文本。
+    每次按键只重新检索一次 (会话会在上一次的结果中继续缩小范围), 并且只读取、渲染当前一页,
+    所以每次按键的开销与屏幕高度有关, 与文献库的大小无关。
+    """
+    def __init__(self, session, format_entry, query: str = "", console: Console | None = None):
+        self.session = session
+        self.format_entry = format_entry
+        self.console = console or Console()
+        self.query = query
+        self.cursor = 0
+        self.selected = []  # 按选择顺序保存的 key
+        self.total = 0
+        self.page = []
+
+    @property
+    def page_size(self) -> int:
+        # 留出输入行、状态行与提示行
+        return max(self.console.size.height - 4, 3)
+
+    def _refresh(self):
+        offset = self.cursor - self.cursor % self.page_size
+        self.total, self.page = self.session.page(self.query.split(), offset, self.page_size)
+
+    def _render(self) -> Group:
+        offset = self.cursor - self.cursor % self.page_size
+        lines = [Text.from_markup(f"[bold cyan]Search[/bold cyan] › {escape(self.query)}[blink]▏[/blink]")]
+        pages = max((self.total - 1) // self.page_size + 1, 1)
+        lines.append(Text.from_markup(
+            f"[dim]{self.total} of {len(self.session)} entries · page {offset // self.page_size + 1}/{pages}"
+            f" · {len(self.selected)} selected[/dim]"
+        ))
+        for i, (entry, _score) in enumerate(self.page):
+            mark = "[green]●[/green]" if entry.key in self.selected else " "
+            pointer = "[bold magenta]›[/bold magenta]" if offset + i == self.cursor else " "
+            line = Text.from_markup(f"{pointer}{mark} {self.format_entry(entry)}")
+            line.truncate(self.console.size.width, overflow="ellipsis")
+            lines.append(line)
+        lines.extend(Text("") for _ in range(self.page_size - len(self.page)))
+        lines.append(Text.from_markup(
+            "[dim]↑/↓ move · PgUp/PgDn page · Tab select · Enter copy · Esc quit[/dim]"
+        ))
+        return Group(*lines)
+
+    def _move(self, delta: int):
+        if self.total:
+            self.cursor = min(max(self.cursor + delta, 0), self.total - 1)
+
+    def _current_key(self) -> str | None:
+        index = self.cursor % self.page_size
+        return self.page[index][0].key if index < len(self.page) else None
+
+    def run(self) -> list:
+        """显示选择器, 返回选中的 key 列表 (按选择顺序); 取消时返回空列表"""
+        self._refresh()
+        with _Keyboard() as keyboard, Live(self._render(), console=self.console, screen=True,
+                                             auto_refresh=False) as live:
+            while True:
+                query = self.query
+                for key in keyboard.read():
+                    if key == ESCAPE:
+                        return []
+                    if key == ENTER:
+                        current = self._current_key()
+                        if self.selected:
+                            return self.selected
+                        return [current] if current else []
+                    if key == TAB:
+                        current = self._current_key()
+                        if current in self.selected:
+                            self.selected.remove(current)
+                        elif current:
+                            self.selected.append(current)
+                        self._move(1)
+                    elif key == UP:
+                        self._move(-1)
+                    elif key == DOWN:
+                        self._move(1)
+                    elif key == PAGE_UP:
+                        self._move(-self.page_size)
+                    elif key == PAGE_DOWN:
+                        self._move(self.page_size)
+                    elif key == BACKSPACE:
+                        self.query = self.query[:-1]
+                    elif key == CLEAR:
+                        self.query = ""
+                    elif len(key) == 1:
+                        self.query += key
+                if self.query != query:
+                    self.cursor = 0
+                self._refresh()
+                live.update(self._render(), refresh=True)
@@ -0,0 +1,83 @@
+# 构建性能分析: 记录各阶段耗时, 输出 JSON 报告与 Rich 表格
+
+import json
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from rich.table import Table
+
+# Pandoc --verbose 的过滤器计时, 例如 "[INFO] Completed filter pandoc-crossref in 42 ms"
+_FILTER_COMPLETED = re.compile(r"Completed filter (\S+) in (\d+) ms")
+_MAKEPDF_RUN = re.compile(r"^\[makePDF\] Run(?:ning)? (\S+)")
+_LATEX_OUTPUT = re.compile(r"Output written on .*?\((\d+) pages?")
+
+
+class BuildProfile:
+    """线程安全地收集一次构建中各阶段的耗时"""
+    def __init__(self):
+        self.stages = []
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, **details):
+        with self._lock:
+            self.stages.append({"stage": stage, "seconds": round(seconds, 4), **details})
+
+    def add_pandoc_log(self, prefix: str, stderr: str, total_seconds: float):
+        """
+        从 Pandoc --verbose 输出中拆出各过滤器 (pandoc-crossref, citeproc) 的耗时,
+        剩余部分记为读写阶段。
+        """
+        filter_seconds = 0.0
+        for name, ms in _FILTER_COMPLETED.findall(stderr):
+            seconds = int(ms) / 1000
+            filter_seconds += seconds
+            self.add(f"{prefix}: filter {name}", seconds)
+        self.add(f"{prefix}: read/write", max(0.0, total_seconds - filter_seconds))
+
+    def to_dict(self) -> dict:
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "total_seconds": round(time.perf_counter() - self._started, 4),
+            "stages": self.stages,
+        }
+
+    def write_json(self, output_dir: Path, **context) -> Path:
+        report_dir = output_dir / "profile"
+        report_dir.mkdir(parents=True, exist_ok=True)
+        path = report_dir / f"build-{self.started_at:%Y%m%d-%H%M%S}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({**context, **self.to_dict()}, f, indent=2, ensure_ascii=False)
+        return path
+
+    def render_table(self) -> Table:
+        report = self.to_dict()
+        total = report["total_seconds"] or 1.0
+        table = Table(title=f"PAW Build Profile ({report['total_seconds']:.2f}s)")
+        table.add_column("Stage", style="cyan")
+        table.add_column("Time", justify="right")
+        table.add_column("Share", justify="right")
+        table.add_column("Details", style="dim")
+        for stage in self.stages:
+            details = ", ".join(f"{k}={v}" for k, v in stage.items() if k not in ("stage", "seconds"))
+            table.add_row(stage["stage"], f"{stage['seconds']:.3f}s", f"{stage['seconds'] / total:.0%}", details)
+        return table
+
+
+def parse_engine_log(log_text: str) -> dict:
+    """从 Pandoc (makePDF) 或 LaTeX 引擎日志中提取编译遍数、页数与警告统计"""
+    runs = [match.group(1) for match in map(_MAKEPDF_RUN.match, log_text.splitlines()) if match]
+    pages = _LATEX_OUTPUT.findall(log_text)
+    stats = {
+        "latex_warnings": log_text.count("LaTeX Warning"),
+        "overfull_boxes": log_text.count("Overfull \\"),
+        "underfull_boxes": log_text.count("Underfull \\"),
+    }
+    if runs:
+        stats["engine_runs"] = len(runs)
+    if pages:
+        stats["pages"] = int(pages[-1])
+    return stats
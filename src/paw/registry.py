@@ -0,0 +1,69 @@
+# 按需加载的命令注册表: 命令模块只在命令真正执行时才导入
+
+import importlib
+from dataclasses import dataclass
+import click
+import typer
+from typer.core import TyperGroup
+
+
+@dataclass(frozen=True)
+class LazyCommand:
+    """一条注册项: target 形如 "build:build" (paw.commands.build 模块中的 build 函数或 Typer 子应用)"""
+    target: str
+    help: str | None = None
+    hidden: bool = False
+
+
+class LazyGroup(TyperGroup):
+    """
+    顶层命令组。lazy_commands 中的命令在第一次被调用时才导入对应模块并转换为 Click 命令;
+    显示 `paw --help` 时只用注册表里的帮助文本, 不导入任何命令模块。
+    """
+    lazy_commands: dict = {}
+    # 已加载的命令; 放在类上, 常驻进程中每次重新构建命令组时也能复用
+    _loaded: dict = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._listing = False
+
+    def list_commands(self, ctx: click.Context) -> list:
+        return super().list_commands(ctx) + [name for name in self.lazy_commands if name not in self.commands]
+
+    def get_command(self, ctx: click.Context, name: str):
+        command = super().get_command(ctx, name)
+        if command is not None or name not in self.lazy_commands:
+            return command
+        spec = self.lazy_commands[name]
+        if self._listing:
+            # 只是为了列出命令的帮助文本, 用占位命令代替, 不导入模块
+            return click.Command(name, help=spec.help, hidden=spec.hidden)
+        if name not in self._loaded:
+            self._loaded[name] = load_command(name, spec)
+        return self._loaded[name]
+
+    def format_help(self, ctx: click.Context, formatter: click.HelpFormatter):
+        self._listing = True
+        try:
+            return super().format_help(ctx, formatter)
+        finally:
+            self._listing = False
+
+    def load_all(self):
+        """导入全部命令 (paw daemon 启动时预热, 之后的请求不再付出导入开销)"""
+        for name, spec in self.lazy_commands.items():
+            if name not in self._loaded:
+                self._loaded[name] = load_command(name, spec)
+
+
+def load_command(name: str, spec: LazyCommand) -> click.Command:
+    module_name, attr = spec.target.split(":")
+    obj = getattr(importlib.import_module(f"paw.commands.{module_name}"), attr)
+    # 与直接注册到 app 上时一样, 由一个不带补全选项的父级 Typer 构建
+    parent = typer.Typer(add_completion=False)
+    if isinstance(obj, typer.Typer):
+        parent.add_typer(obj, name=name, help=spec.help, hidden=spec.hidden)
+        return typer.main.get_command(parent).commands[name]
+    parent.command(name=name, help=spec.help, hidden=spec.hidden)(obj)
+    return typer.main.get_command(parent)
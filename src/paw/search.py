@@ -0,0 +1,101 @@
+# 文献检索用的分词、模糊匹配与 BM25 打分。只依赖标准库, 供 bibindex 建立和查询倒排索引
+
+import math
+import re
+import unicodedata
+
+# 参与检索的字段及其权重 (BM25F 中的字段加权); 顺序即倒排表中的字段编号
+FIELDS = ("key", "author", "title", "year", "journal", "keywords", "abstract", "doi")
+FIELD_WEIGHTS = (3.0, 3.0, 2.0, 1.5, 1.0, 1.5, 0.5, 1.0)
+
+K1 = 1.2
+B = 0.75
+
+# 匹配方式对得分的折扣: 完整词 > 前缀 > 拼写相近
+EXACT, PREFIX, FUZZY = 1.0, 0.8, 0.6
+# 前缀与模糊匹配的最短查询长度 (太短的词会展开出大量候选)
+MIN_PREFIX = 3
+MIN_FUZZY = 4
+# 更短的词作为最后一个词 (正在输入) 时, 除完整词外只展开这么多个以它开头的词项
+SHORT_PREFIX_TOKENS = 16
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_TOKEN = re.compile(f"[a-z0-9]+|[{_CJK}]+")
+_CJK_RUN = re.compile(f"[{_CJK}]")
+_LATEX_COMMAND = re.compile(r"\\[a-zA-Z]+\s*|\\.")
+
+
+def normalize(text: str) -> str:
+    """小写, 去掉 LaTeX 命令与花括号, 并去除变音符号 (Müller -> muller)"""
+    text = _LATEX_COMMAND.sub("", text).replace("{", "").replace("}", "")
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> list:
+    """
+    拉丁字母与数字按连续的字母数字切分; 中日韩文字没有空格分词, 按相邻两字 (bigram) 切分,
+    单独一个字时保留单字。
+    """
+    tokens = []
+    for run in _TOKEN.findall(normalize(text)):
+        if _CJK_RUN.match(run) and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def index_terms(text: str) -> list:
+    """建索引时的词项: 在 tokenize 的基础上为中日韩文字补充单字, 以便检索单字"""
+    tokens = tokenize(text)
+    for run in _TOKEN.findall(normalize(text)):
+        if _CJK_RUN.match(run) and len(run) > 1:
+            tokens.extend(run)
+    return tokens
+
+
+def is_cjk(token: str) -> bool:
+    return bool(_CJK_RUN.match(token))
+
+
+def max_typos(token: str) -> int:
+    """允许的拼写错误数: 短词不做模糊匹配, 长词最多两处"""
+    if len(token) < MIN_FUZZY or is_cjk(token):
+        return 0
+    return 1 if len(token) < 8 else 2
+
+
+def within_distance(a: str, b: str, limit: int) -> bool:
+    """a 与 b 的编辑距离 (含相邻换位) 是否不超过 limit; 超过时提前结束"""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return False
+        previous2, previous = previous, current
+    return previous[-1] <= limit
+
+
+def idf(n_docs: int, df: int) -> float:
+    return math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+
+def bm25(weighted_tf: float, doc_length: float, avg_length: float, term_idf: float) -> float:
+    norm = K1 * (1 - B + B * doc_length / avg_length) if avg_length else K1
+    return term_idf * weighted_tf * (K1 + 1) / (weighted_tf + norm)
+
+
+def usage_boost(count: int, age_days: float) -> float:
+    """最近常用的文献排在前面: 使用次数取对数, 按 30 天半衰期衰减"""
+    if not count:
+        return 1.0
+    return 1.0 + 0.5 * math.log1p(count) * 0.5 ** (max(age_days, 0.0) / 30)
@@ -68,6 +68,10 @@ def get_metadata_template(title: str) -> str:
         
         # --- PDF 渲染引擎 ---
         pdf-engine: xelatex
+        # 增量 PDF 编译: 在 output/.latex 中保留 LaTeX 中间文件, 复用上一次的 .aux/.toc
+        # incremental-pdf: true
+        # 图片预处理的分辨率: SVG 按此 DPI 栅格化, 过大的位图按 6.5 英寸版心宽度缩小
+        # figure-dpi: 300
     ''')
 
 
@@ -139,6 +143,13 @@ def get_makefile_template() -> str:
         	@rm -rf $(OUT_DIR)/*
     ''')
 
+def get_project_marker_template() -> str:
+    """项目根目录的 .paw-project 标记文件, PAW 靠它快速找到项目根目录"""
+    return textwrap.dedent('''
+        # 这个文件标记了一个 PAW 项目的根目录, 请随项目一起保留 (并提交到 Git)。
+        # PAW 从当前目录向上查找它来确定项目位置; 也可以用环境变量 PAW_PROJECT 直接指定。
+    ''').lstrip()
+
 def get_gitignore_template() -> str:
     # (已恢复完整内容)
     return textwrap.dedent('''
@@ -1,18 +1,36 @@
 import shutil
 import re
 import io
+import os
 import sys
+import functools
+from contextlib import contextmanager
 from pathlib import Path
 import typer
 from rich.console import Console
 from . import config
-from ruamel.yaml import YAML
-from pybtex.database import parse_file as parse_bib_file
+from .cache import atomic_write, memoize_by_stat
+from .discovery import find_project_root
 
 console = Console()
-yaml = YAML()
-yaml.preserve_quotes = True
-yaml.indent(mapping=2, sequence=4, offset=2)
+
+
+# ruamel.yaml 导入较慢, 只在第一次真正用到时导入, 不拖慢 paw meow 等简单命令的启动
+@functools.cache
+def round_trip_yaml():
+    """round-trip 模式: 保留注释与引号, 只用于需要写回文件的场景 (update_yaml_key 等)"""
+    from ruamel.yaml import YAML
+    yaml = YAML()
+    yaml.preserve_quotes = True
+    yaml.indent(mapping=2, sequence=4, offset=2)
+    return yaml
+
+
+@functools.cache
+def safe_yaml():
+    """safe 模式: 只读场景使用, 装有 ruamel.yaml.clib 时由 C 实现解析, 比 round-trip 模式快得多"""
+    from ruamel.yaml import YAML
+    return YAML(typ="safe")
 
 def get_pandoc_path() -> str:
     """智能地获取 Pandoc 的路径。"""
@@ -32,10 +50,25 @@ def get_pandoc_path() -> str:
 
 
 def read_yaml_file(file_path: Path) -> dict:
-    """ (最终稳定版) 读取一个 YAML 文件并返回其内容。 """
+    """ (最终稳定版) 以 round-trip 模式读取一个 YAML 文件并返回其内容, 供修改后写回; 只读请用 load_yaml_file。 """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = round_trip_yaml().load(f)
+        return data or {}
+    except Exception as e:
+        console.print(f"[bold red]Error reading YAML file {file_path}: {e}[/bold red]")
+        raise typer.Exit(1)
+
+
+@memoize_by_stat
+def load_yaml_file(file_path: Path) -> dict:
+    """
+    只读地加载 YAML 文件: 使用 safe 加载器, 并以文件状态 (mtime + size) 缓存解析结果。
+    返回值被所有调用方共享, 不可修改; 需要修改并写回时请使用 read_yaml_file。
+    """
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
-            data = yaml.load(f)
+            data = safe_yaml().load(f)
         return data or {}
     except Exception as e:
         console.print(f"[bold red]Error reading YAML file {file_path}: {e}[/bold red]")
@@ -43,15 +76,102 @@ def read_yaml_file(file_path: Path) -> dict:
 
 
 def write_yaml_file(file_path: Path, data: dict):
-    """ (最终稳定版) 将数据安全地写回 YAML 文件。 """
+    """ (最终稳定版) 将数据安全地写回 YAML 文件 (先写临时文件再原子重命名)。 """
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            yaml.dump(data, f)
+        buffer = io.StringIO()
+        round_trip_yaml().dump(data, buffer)
+        atomic_write_text(file_path, buffer.getvalue())
     except Exception as e:
         console.print(f"[bold red]Error writing YAML file {file_path}: {e}[/bold red]")
         raise typer.Exit(1)
 
 
+def atomic_write_text(file_path: Path, text: str):
+    """先写同目录下的临时文件再重命名, 写入中途被打断也不会留下截断的文件"""
+    with atomic_write(file_path) as f:
+        f.write(text)
+
+
+class MetadataTransaction:
+    """
+    对 YAML 文件 (通常是 metadata.yaml) 的一组修改:
+
+        with MetadataTransaction(path) as meta:
+            meta.set("csl", "apa.csl")
+            meta.append("bibliography", "resources/refs.bib")
+
+    进入时只做一次 round-trip 解析 (保留注释与引号), 正常退出 with 块时一次性原子写回;
+    块内出现异常则什么都不写。没有实际改动时不写文件, 避免无谓地改变 mtime 让构建缓存失效。
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self.data = None
+        self.changes = []
+        self.written = False
+        self._original = ""
+
+    def __enter__(self):
+        try:
+            self._original = self.path.read_text(encoding="utf-8")
+            self.data = round_trip_yaml().load(self._original)
+        except Exception as e:
+            console.print(f"[bold red]Error reading YAML file {self.path}: {e}[/bold red]")
+            raise typer.Exit(1)
+        if self.data is None:
+            self.data = {}
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        return False
+
+    def set(self, key: str, value):
+        """设置一个键; 原来是带引号的字符串时, 新值沿用同样的引号风格"""
+        old = self.data.get(key)
+        if old == value and key in self.data:
+            return
+        if isinstance(old, str) and isinstance(value, str) and type(old) is not str:
+            value = type(old)(value)
+        self.data[key] = value
+        self.changes.append(key)
+
+    def append(self, key: str, value):
+        """向列表类型的键追加一项 (已存在则忽略); 原来是单个字符串时先转换为列表"""
+        current = self.data.get(key)
+        if current is None:
+            current = self.data[key] = []
+        elif not isinstance(current, list):
+            current = self.data[key] = [current]
+        if value not in current:
+            current.append(value)
+            self.changes.append(key)
+
+    def remove(self, key: str):
+        if key in self.data:
+            del self.data[key]
+            self.changes.append(key)
+
+    def commit(self) -> bool:
+        """写回文件; 返回是否真的写入了"""
+        if not self.changes:
+            return False
+        try:
+            buffer = io.StringIO()
+            round_trip_yaml().dump(self.data, buffer)
+            text = buffer.getvalue()
+            if text == self._original:
+                return False
+            atomic_write_text(self.path, text)
+        except Exception as e:
+            console.print(f"[bold red]Error writing YAML file {self.path}: {e}[/bold red]")
+            raise typer.Exit(1)
+        self._original = text
+        self.changes = []
+        self.written = True
+        return True
+
+
 def ensure_paw_dirs():
     """确保 PAW 全局资源目录存在"""
     try:
@@ -63,58 +183,99 @@ def ensure_paw_dirs():
         raise typer.Exit(1)
 
 
-def find_project_root() -> Path | None:
-    """通过寻找 Makefile 来确定项目根目录"""
-    current_dir = Path.cwd().resolve()
-    for _ in range(8):
-        if (current_dir / "Makefile").exists() and (current_dir / "manuscript").is_dir():
-            return current_dir
-        if current_dir.parent == current_dir:
-            break
-        current_dir = current_dir.parent
-    return None
+def _lock_file(f, blocking: bool):
+    """对已打开的文件加独占锁; 非阻塞模式下锁被占用时抛出 OSError"""
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+        import time
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                if not blocking:
+                    raise
+                time.sleep(0.2)
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+
+
+def _unlock_file(f):
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        return
+    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def project_lock(lock_path: Path):
+    """
+    跨进程的项目锁。
+    防止两个同时运行的 paw build (例如编辑器保存时自动编译 + CI) 互相覆盖输出文件。
+    """
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+") as f:
+        try:
+            _lock_file(f, blocking=False)
+        except OSError:
+            console.print("[yellow]Another PAW build is running in this project, waiting for it to finish...[/yellow]")
+            _lock_file(f, blocking=True)
+        try:
+            yield
+        finally:
+            _unlock_file(f)
+
+
+def is_project_root(directory: Path) -> bool:
+    """一个目录是否是 PAW 项目根目录 (Makefile + manuscript/ + metadata.yaml)"""
+    return (
+        (directory / "Makefile").is_file()
+        and (directory / "manuscript").is_dir()
+        and (directory / "manuscript" / "metadata.yaml").is_file()
+    )
+
+
+def find_projects(base_dir: Path) -> list:
+    """向下搜索 base_dir 中的所有 PAW 项目 (不会进入项目内部, 跳过隐藏目录)"""
+    projects = []
+    for current, dirs, _files in os.walk(base_dir):
+        current_path = Path(current)
+        if is_project_root(current_path):
+            projects.append(current_path)
+            dirs[:] = []
+            continue
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d not in ("node_modules", "__pycache__"))
+    return projects
+
+
+def paw_command() -> list:
+    """重新调用 PAW 自身的命令行 (兼容 PyInstaller/Nuitka 打包后的可执行文件)"""
+    if getattr(sys, "frozen", False) or "__compiled__" in globals():
+        return [sys.executable]
+    return [sys.executable, "-m", "paw.main"]
 
 
 def get_project_paths():
-    """获取当前 PAW 项目的关键路径 (最终版)"""
-    root = find_project_root()
-    if not root:
-        console.print("[bold red]Error:[/bold red] Not inside a PAW project. Could not find project root.")
-        raise typer.Exit(1)
-    
-    paths = {
-        "root": root,
-        "manuscript": root / "manuscript",
-        "resources": root / "resources",
-        "figures": root / "figures",
-        "output": root / "output",
-        "metadata": root / "manuscript" / "metadata.yaml"
-    }
-    if not paths["metadata"].exists():
-        console.print(f"[bold red]Error:[/bold red] Metadata file not found at '{paths['metadata']}'")
-        raise typer.Exit(1)
-    return paths
+    """获取当前 PAW 项目的关键路径 (以字典形式, 新代码请直接使用 context.get_context())"""
+    from .context import get_context
+    return get_context().paths
 
 
 def update_yaml_key(yaml_path: Path, key: str, value):
-    """(最终版) 更新一个纯 YAML 文件中的键值"""
-    try:
-        data = read_yaml_file(yaml_path)
-        
+    """(最终版) 更新一个纯 YAML 文件中的键值; bibliography 是列表, 追加而不是覆盖"""
+    with MetadataTransaction(yaml_path) as meta:
         if key == "bibliography":
-            if key not in data or not isinstance(data.get(key), list):
-                data[key] = []
-            if value not in data[key]:
-                data[key].append(value)
+            meta.append(key, value)
         else:
-            data[key] = value
-
-        write_yaml_file(yaml_path, data)
+            meta.set(key, value)
+    if meta.written:
         console.print(f"[green]✓ Updated '{key}' in '{yaml_path.name}'.[/green]")
-
-    except Exception as e:
-        console.print(f"[bold red]Error updating YAML file: {e}[/bold red]")
-        raise typer.Exit(1)
+    else:
+        console.print(f"[dim]'{key}' in '{yaml_path.name}' is already up to date.[/dim]")
 
 
 class ResourceHandler:
@@ -124,7 +285,6 @@ class ResourceHandler:
         self.resource_ext = resource_ext
         self.global_dir = global_dir
         self.yaml_key = yaml_key
-        ensure_paw_dirs()
 
     def add(self, source_path: Path):
         if not source_path.exists():
@@ -133,6 +293,7 @@ class ResourceHandler:
         if source_path.suffix != self.resource_ext:
             console.print(f"[bold red]Error:[/bold] File must be a '{self.resource_ext}' file.")
             raise typer.Exit(1)
+        ensure_paw_dirs()
         dest_path = self.global_dir / source_path.name
         try:
             shutil.copy(source_path, dest_path)
@@ -172,8 +333,9 @@ class ResourceHandler:
             console.print(f"[bold red]Error:[/bold] {self.resource_type.capitalize()} '{name}' not found in the global library.")
             raise typer.Exit(1)
 
-        project_paths = get_project_paths()
-        dest_path = project_paths["resources"] / name
+        from .context import get_context
+        ctx = get_context()
+        dest_path = ctx.resources / name
         try:
             shutil.copy(source_path, dest_path)
             console.print(f"[green]✓ Copied '{name}' to '{dest_path}'.[/green]")
@@ -182,4 +344,4 @@ class ResourceHandler:
             raise typer.Exit(1)
         
         # 使用全新的、绝对可靠的 YAML 更新逻辑
-        update_yaml_key(project_paths["metadata"], self.yaml_key, name)
\ No newline at end of file
+        update_yaml_key(ctx.metadata_path, self.yaml_key, name)
\ No newline at end of file
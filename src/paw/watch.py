@@ -0,0 +1,170 @@
+# 文件监视: Linux 上使用 inotify, 其他平台退回到 stat 轮询
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+# inotify 事件掩码 (见 <sys/inotify.h>)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ATTRIB
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_ignored(name: str) -> bool:
+    """忽略编辑器与 PAW 自身产生的临时文件"""
+    return name.startswith((".", "#")) or name.endswith(("~", ".swp", ".swx", ".tmp"))
+
+
+class PollingWatcher:
+    """
+    通过周期性 stat 检测变化的监视器。
+    targets: 目录 -> 需要关注的文件名集合 (None 表示整个目录)。
+    """
+    def __init__(self, targets: dict, interval: float = 0.5):
+        self.targets = targets
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict:
+        snapshot = {}
+        for directory, names in self.targets.items():
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if is_ignored(entry.name) or (names is not None and entry.name not in names):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if not entry.is_dir():
+                    snapshot[entry.path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def poll(self, timeout: float | None) -> set:
+        """阻塞至多 timeout 秒 (None 表示一直等待), 返回发生变化的路径集合"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {path for path in current.keys() | self._snapshot.keys() if current.get(path) != self._snapshot.get(path)}
+            self._snapshot = current
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            wait = self.interval if deadline is None else min(self.interval, max(0.0, deadline - time.monotonic()))
+            time.sleep(wait)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """基于 inotify 的监视器, 仅在 Linux 上可用; 语义与 PollingWatcher 相同"""
+    def __init__(self, targets: dict):
+        # 新建的子目录会被加入, 不修改调用方的字典
+        self.targets = dict(targets)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches = {}
+        try:
+            for directory in list(targets):
+                self._add_watch(directory)
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def _add_watch(self, directory: Path):
+        """失败时 (例如达到 fs.inotify.max_user_watches) 抛出 OSError, 由 create_watcher 退回到轮询"""
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(str(directory)), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_add_watch failed for '{directory}': {os.strerror(errno)}")
+        self._watches[wd] = directory
+
+    def _watch_new_directory(self, directory: Path) -> set:
+        """
+        监视整个目录的目标下新建 (或移入) 的子目录, 连同其中已有的子目录一起;
+        返回监视建立之前就已写入的文件, 以免漏掉这些改动。
+        """
+        existing = set()
+        for current, dirs, files in os.walk(directory):
+            dirs[:] = [d for d in dirs if not is_ignored(d)]
+            current = Path(current)
+            self.targets[current] = None
+            try:
+                self._add_watch(current)
+            except OSError:
+                continue  # 目录已被删除, 或达到 watch 上限: 至少不影响已有的监视
+            existing.update(str(current / name) for name in files if not is_ignored(name))
+        return existing
+
+    def _read_events(self) -> set:
+        changed = set()
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(buffer):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buffer, offset)
+            raw_name = buffer[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length]
+            offset += _EVENT_HEADER.size + length
+            if mask & IN_IGNORED:
+                # 目录被删除或移走, 内核已撤销该监视
+                self._watches.pop(wd, None)
+                continue
+            name = os.fsdecode(raw_name.rstrip(b"\0"))
+            directory = self._watches.get(wd)
+            if directory is None or not name or is_ignored(name):
+                continue
+            names = self.targets.get(directory)
+            if names is None or name in names:
+                changed.add(str(Path(directory) / name))
+            if names is None and mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                changed |= self._watch_new_directory(Path(directory) / name)
+        return changed
+
+    def poll(self, timeout: float | None) -> set:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+            if ready:
+                changed = self._read_events()
+                if changed:
+                    return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+
+    def close(self):
+        os.close(self._fd)
+
+
+def create_watcher(targets: dict):
+    """优先使用 inotify, 不可用时 (非 Linux 或达到 watch 上限) 退回到轮询"""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(targets)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(targets)
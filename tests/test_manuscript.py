@@ -0,0 +1,83 @@
+import unittest
+
+from paw import manuscript
+
+
+def inlines(text: str) -> list:
+    result = []
+    for i, word in enumerate(text.split(" ")):
+        if i:
+            result.append({"t": "Space"})
+        result.append({"t": "Str", "c": word})
+    return result
+
+
+def header(text: str, identifier: str, level: int = 1) -> dict:
+    return {"t": "Header", "c": [level, [identifier, [], []], inlines(text)]}
+
+
+def chapter(*blocks) -> dict:
+    return {"pandoc-api-version": [1, 23], "meta": {}, "blocks": list(blocks)}
+
+
+def ids(document: dict) -> list:
+    return [block["c"][1][0] for block in document["blocks"] if block["t"] == "Header"]
+
+
+class AutoIdentifierTest(unittest.TestCase):
+    def test_examples_from_pandoc_manual(self):
+        self.assertEqual(manuscript.auto_identifier(inlines("Heading identifiers in HTML")), "heading-identifiers-in-html")
+        self.assertEqual(manuscript.auto_identifier(inlines("Maître d'hôtel")), "maître-dhôtel")
+        self.assertEqual(manuscript.auto_identifier(inlines("3. Applications")), "applications")
+        self.assertEqual(manuscript.auto_identifier(inlines("33")), "section")
+
+
+class AssembleTest(unittest.TestCase):
+    def test_auto_identifiers_are_unique_across_chapters(self):
+        document = manuscript.assemble([
+            chapter(header("Introduction", "introduction"), header("Methods", "methods")),
+            chapter(header("Introduction", "introduction"), header("Introduction", "introduction-1")),
+        ])
+        self.assertEqual(ids(document), ["introduction", "methods", "introduction-1", "introduction-2"])
+
+    def test_explicit_identifiers_are_kept(self):
+        document = manuscript.assemble([
+            chapter(header("Introduction", "sec:intro")),
+            chapter(header("Introduction", "introduction"), header("Background", "sec:intro")),
+        ])
+        self.assertEqual(ids(document), ["sec:intro", "introduction", "sec:intro"])
+
+    def test_headers_inside_divs(self):
+        div = {"t": "Div", "c": [["", [], []], [header("Results", "results", 2)]]}
+        document = manuscript.assemble([chapter(header("Results", "results")), chapter(div)])
+        self.assertEqual(div["c"][1][0]["c"][1][0], "results-1")
+        self.assertEqual(len(document["blocks"]), 2)
+
+    def test_metadata_from_first_chapter_wins(self):
+        first, second = chapter(), chapter()
+        first["meta"] = {"title": {"t": "MetaString", "c": "A"}}
+        second["meta"] = {"title": {"t": "MetaString", "c": "B"}, "lang": {"t": "MetaString", "c": "en"}}
+        document = manuscript.assemble([first, second])
+        self.assertEqual(document["meta"]["title"]["c"], "A")
+        self.assertEqual(document["meta"]["lang"]["c"], "en")
+
+
+class CrossChapterReferenceTest(unittest.TestCase):
+    def test_reference_link_defined_in_another_chapter(self):
+        texts = ["See the [manual][pandoc].\n", "# Links\n\n[Pandoc]: https://pandoc.org\n"]
+        self.assertTrue(manuscript.has_cross_chapter_references(texts))
+
+    def test_footnote_defined_in_another_chapter(self):
+        texts = ["A claim.[^src]\n", "[^src]: The source.\n"]
+        self.assertTrue(manuscript.has_cross_chapter_references(texts))
+
+    def test_self_contained_chapters(self):
+        texts = [
+            "A claim.[^1]\n\n[^1]: First.\n",
+            "Another claim.[^1] See [@smith2020].\n\n[^1]: Second.\n",
+        ]
+        self.assertFalse(manuscript.has_cross_chapter_references(texts))
+
+
+if __name__ == "__main__":
+    unittest.main()